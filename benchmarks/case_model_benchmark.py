@@ -0,0 +1,90 @@
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'manual_scraping'))
+
+from case_model import Case, load_cases, dumps_cases
+from court_cases import load_json
+
+DEFAULT_CASES = os.path.join(ROOT_DIR, 'src', 'data', 'court_cases.json')
+
+def write_scaled_corpus(input_file: str, scale: int, output_file: str) -> int:
+    """Repeat the cases scale times with distinct filenames and hashes"""
+    data = load_json(input_file)
+    cases = []
+    for copy in range(scale):
+        for i, case in enumerate(data['cases']):
+            case = dict(case)
+            case['filename'] = f"{copy}_{case['filename']}"
+            if 'content_hash' in case:
+                case['content_hash'] = f"{copy:08x}{case['content_hash'][8:]}"
+            cases.append(case)
+    data['cases'] = cases
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return len(cases)
+
+def measure(name: str, load: Callable, input_file: str, repeats: int) -> Dict:
+    """Best load time of repeats runs, then the memory held by the loaded corpus"""
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start_time = time.perf_counter()
+        data = load(input_file)
+        times.append(time.perf_counter() - start_time)
+        del data
+
+    gc.collect()
+    tracemalloc.start()
+    data = load(input_file)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'form': name, 'seconds': min(times), 'bytes': current, 'peak_bytes': peak,
+            'cases': len(data['cases']), 'data': data}
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and load time of the Case model against plain dicts")
+    parser.add_argument('--cases', default=DEFAULT_CASES, help="court_cases.json to load")
+    parser.add_argument('--scale', type=int, default=10, help="Copies of the corpus to load at once")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='case_model_benchmark_') as work_dir:
+        input_file = os.path.join(work_dir, 'court_cases.json')
+        write_scaled_corpus(args.cases, args.scale, input_file)
+        with open(input_file, 'r', encoding='utf-8') as f:
+            original = f.read()
+
+        results = []
+        for name, load in [('dict', load_json), ('Case', load_cases)]:
+            result = measure(name, load, input_file, args.repeats)
+            data = result.pop('data')
+            if name == 'Case':
+                assert all(isinstance(case, Case) for case in data['cases'])
+            result['round_trip'] = dumps_cases(data) == original
+            del data
+            results.append(result)
+
+    print(f"\n{'form':<6} {'cases':>8} {'load s':>8} {'MB held':>9} {'peak MB':>9} {'B/case':>8} {'round trip':>11}")
+    for result in results:
+        print(f"{result['form']:<6} {result['cases']:>8} {result['seconds']:>8.3f} {result['bytes'] / 2**20:>9.1f} "
+              f"{result['peak_bytes'] / 2**20:>9.1f} {result['bytes'] / result['cases']:>8.0f} {str(result['round_trip']):>11}")
+    dict_result, case_result = results
+    print(f"\nCase holds {case_result['bytes'] / dict_result['bytes']:.0%} of the dict memory "
+          f"and loads in {case_result['seconds'] / dict_result['seconds']:.0%} of the time")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
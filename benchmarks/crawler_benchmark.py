@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'manual_scraping'))
+
+import extract_verdict_links
+from extract_areas import extract_areas
+from extract_verdicts import load_area_cases
+from mock_fup_server import MockConfig, MockFupServer
+
+def reset_http_stats():
+    with extract_verdict_links.http_stats_lock:
+        for key in extract_verdict_links.http_stats:
+            extract_verdict_links.http_stats[key] = 0
+
+def snapshot(server: MockFupServer) -> Dict:
+    with server.stats_lock:
+        server_stats = dict(server.stats)
+    with extract_verdict_links.http_stats_lock:
+        client_stats = dict(extract_verdict_links.http_stats)
+    return {'client': client_stats, 'server': server_stats}
+
+def bench_crawl(server: MockFupServer, work_dir: str, args) -> Dict:
+    """Time scrape_areas against the mock site"""
+    reset_http_stats()
+    output_file = os.path.join(work_dir, 'verdict_links.json')
+    start_time = time.perf_counter()
+    court_cases = extract_verdict_links.scrape_areas(
+        max_total_verdicts=args.max_verdicts, base_url=server.base_url, output_file=output_file,
+        area_delay=args.area_delay, case_delay=args.case_delay
+    )
+    elapsed = time.perf_counter() - start_time
+    stats = extract_verdict_links.http_stats
+    return {
+        'stage': 'crawl',
+        'seconds': elapsed,
+        'cases': len(court_cases),
+        'cases_per_second': len(court_cases) / elapsed if elapsed else 0.0,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'failures': stats['failures'],
+        'bytes_per_second': stats['bytes'] / elapsed if elapsed else 0.0,
+        'links': [case['verdict_pdf'] for case in court_cases]
+    }
+
+def bench_download(links, workers: int) -> Dict:
+    """Time fetching every verdict PDF, as download_and_process_pdf does"""
+    reset_http_stats()
+
+    def download(url):
+        response = extract_verdict_links.fetch(url)
+        return len(response.content) if response.status_code == 200 else 0
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(download, links))
+    elapsed = time.perf_counter() - start_time
+    stats = extract_verdict_links.http_stats
+    downloaded = sum(1 for size in sizes if size)
+    return {
+        'stage': 'download',
+        'seconds': elapsed,
+        'cases': downloaded,
+        'cases_per_second': downloaded / elapsed if elapsed else 0.0,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'failures': stats['failures'],
+        'bytes_per_second': sum(sizes) / elapsed if elapsed else 0.0
+    }
+
+def bench_saved_pages(server: MockFupServer, work_dir: str) -> Dict:
+    """Time extract_areas and load_area_cases on pages saved from the mock site"""
+    site = server.site
+    pages_dir = os.path.join(work_dir, 'areas')
+    os.makedirs(pages_dir, exist_ok=True)
+    index_file = os.path.join(work_dir, 'areas.html')
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write(site.index_page())
+    for slug, name in site.areas.items():
+        with open(os.path.join(pages_dir, f"{name.lower()}.html"), 'w', encoding='utf-8') as f:
+            f.write(site.area_page(slug))
+
+    start_time = time.perf_counter()
+    extract_areas(index_file, os.path.join(work_dir, 'areas.json'))
+    num_cases = 0
+    for area_file in sorted(os.listdir(pages_dir)):
+        num_cases += len(load_area_cases(os.path.join(pages_dir, area_file)))
+    elapsed = time.perf_counter() - start_time
+    return {
+        'stage': 'saved_pages',
+        'seconds': elapsed,
+        'cases': num_cases,
+        'cases_per_second': num_cases / elapsed if elapsed else 0.0,
+        'requests': 0,
+        'retries': 0,
+        'failures': 0,
+        'bytes_per_second': 0.0
+    }
+
+def print_report(results, server_stats: Dict):
+    print(f"\n{'stage':<12} {'cases':>7} {'seconds':>9} {'cases/s':>9} {'KB/s':>10} {'requests':>9} {'retries':>8} {'failures':>9}")
+    for result in results:
+        print(f"{result['stage']:<12} {result['cases']:>7} {result['seconds']:>9.2f} {result['cases_per_second']:>9.1f} "
+              f"{result['bytes_per_second'] / 1024:>10.1f} {result['requests']:>9} {result['retries']:>8} {result['failures']:>9}")
+    print(f"\nServer: {server_stats['requests']} requests, {server_stats['errors']} errors, "
+          f"{server_stats['rate_limited']} rate limited, {server_stats['bytes'] / 1024:.1f} KB sent")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawler and downloader benchmark against a local mock fup.link")
+    parser.add_argument('--areas', type=int, default=5)
+    parser.add_argument('--cases', type=int, default=20, help="Cases per area")
+    parser.add_argument('--max-verdicts', type=int, default=1000, help="Passed to scrape_areas")
+    parser.add_argument('--min-pages', type=int, default=2)
+    parser.add_argument('--max-pages', type=int, default=12)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=0)
+    parser.add_argument('--retry-backoff', type=float, default=0.01,
+                        help="Base backoff used by fetch, the crawler default is 1 second")
+    parser.add_argument('--area-delay', type=float, default=0.0, help="The crawler default is 1 second")
+    parser.add_argument('--case-delay', type=float, default=0.0, help="The crawler default is 0.5 seconds")
+    parser.add_argument('--download-workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    config = MockConfig(num_areas=args.areas, cases_per_area=args.cases,
+                        pages_per_pdf=(args.min_pages, args.max_pages), latency=args.latency,
+                        jitter=args.jitter, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                        retry_after=args.retry_after, seed=args.seed)
+    extract_verdict_links.RETRY_BACKOFF = args.retry_backoff
+
+    server = MockFupServer(config).start()
+    work_dir = tempfile.mkdtemp(prefix='crawler_benchmark_')
+    try:
+        crawl = bench_crawl(server, work_dir, args)
+        links = crawl.pop('links')
+        download = bench_download(links, args.download_workers)
+        saved_pages = bench_saved_pages(server, work_dir)
+        results = [crawl, download, saved_pages]
+        server_stats = snapshot(server)['server']
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results, server_stats)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results, 'server': server_stats}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
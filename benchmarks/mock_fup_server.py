@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AREAS_JSON = os.path.join(ROOT_DIR, 'manual_scraping', 'areas.json')
+
+# Words used to fill the generated verdict text
+FILLER_WORDS = [
+    "tingsrätten", "den", "tilltalade", "har", "gjort", "sig", "skyldig", "till", "enligt",
+    "åtalet", "domstolen", "finner", "att", "påföljd", "fängelse", "villkorlig", "dom",
+    "målsägande", "yrkande", "skadestånd", "vittne", "uppgifter", "bevisning", "utredningen"
+]
+CRIME_WORDS = [
+    "narkotika", "rån", "misshandel", "stöld", "bedrägeri", "hot", "våld", "grov",
+    "vapen", "våldtäkt", "barn", "försök", "ofredande", "skadegörelse", "penningtvätt"
+]
+
+class MockConfig:
+    """Shape and failure behaviour of the stand-in site"""
+
+    def __init__(self, num_areas=5, cases_per_area=20, pages_per_pdf=(2, 12), verdict_ratio=0.8,
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=0):
+        self.num_areas = num_areas
+        self.cases_per_area = cases_per_area
+        self.pages_per_pdf = pages_per_pdf
+        # Share of cases whose page links a DOM PDF
+        self.verdict_ratio = verdict_ratio
+        # Seconds added to every response, plus uniform random jitter
+        self.latency = latency
+        self.jitter = jitter
+        # Share of requests answered with 500 and with 429
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.seed = seed
+
+def load_area_names(count: int) -> List[str]:
+    """Real court names where available, so URL conversion is exercised"""
+    names = []
+    if os.path.exists(AREAS_JSON):
+        with open(AREAS_JSON, 'r', encoding='utf-8') as f:
+            names = [area['name'] for area in json.load(f)]
+    while len(names) < count:
+        names.append(f"Testområde {len(names) + 1}")
+    return names[:count]
+
+def url_slug(name: str) -> str:
+    # Same conversion as convert_to_url_safe in extract_verdict_links.py
+    for char, replacement in {'å': 'a', 'ä': 'a', 'ö': 'o', 'Å': 'a', 'Ä': 'a', 'Ö': 'o', ' ': '-'}.items():
+        name = name.replace(char, replacement)
+    return name.lower()
+
+def pdf_escape(text: str) -> bytes:
+    encoded = text.encode('cp1252', errors='replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Build a minimal PDF with one text line per entry on each page"""
+    objects = []
+    num_pages = len(pages)
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then page and content pairs
+    page_ids = [4 + 2 * i for i in range(num_pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {num_pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for i, lines in enumerate(pages):
+        stream = b"BT /F1 10 Tf 14 TL 50 800 Td " + b" ".join(b"(" + pdf_escape(line) + b") Tj T*" for line in lines) + b" ET"
+        stream = zlib.compress(stream)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       f"/Contents {page_ids[i] + 1} 0 R >>".encode())
+        objects.append(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
+
+def make_verdict_pdf(area: str, case_id: str, date: str, num_pages: int, rng: random.Random) -> bytes:
+    """A verdict whose first page carries the court name, case ID and date"""
+    crimes = rng.sample(CRIME_WORDS, 3)
+    pages = []
+    for page_number in range(num_pages):
+        lines = []
+        if page_number == 0:
+            lines += [f"{area.upper()} TINGSRÄTT", f"DOM {date}", f"Mål nr {case_id}"]
+        for _ in range(40):
+            words = [rng.choice(FILLER_WORDS) for _ in range(10)]
+            if rng.random() < 0.3:
+                words[rng.randrange(len(words))] = rng.choice(crimes)
+            lines.append(' '.join(words))
+        pages.append(lines)
+    return make_pdf(pages)
+
+class MockSite:
+    """Deterministic site content generated from the config"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.areas = {url_slug(name): name for name in load_area_names(config.num_areas)}
+        self.cases: Dict[str, Dict[str, Dict]] = {}
+        rng = random.Random(config.seed)
+        for slug in self.areas:
+            self.cases[slug] = {}
+            for _ in range(config.cases_per_area):
+                case_id = f"B {rng.randint(100, 19999)}-{rng.randint(15, 24)}"
+                self.cases[slug][url_slug(case_id)] = {
+                    'case_id': case_id,
+                    'has_verdict': rng.random() < config.verdict_ratio,
+                    'num_pages': rng.randint(*config.pages_per_pdf),
+                    'date': f"20{case_id[-2:]}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                }
+        self._pdf_cache: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def pdf_name(self, slug: str, case_slug: str) -> str:
+        case = self.cases[slug][case_slug]
+        return f"{self.areas[slug].replace(' ', '_')}_TR_{case['case_id'].replace(' ', '_')}_DOM_{case['date']}.pdf"
+
+    def index_page(self) -> str:
+        items = ''.join(f'<li><a href="/tr/{slug}">{name}</a></li>' for slug, name in self.areas.items())
+        return f"<html><body><ul>{items}</ul></body></html>"
+
+    def area_page(self, slug: str) -> Optional[str]:
+        if slug not in self.cases:
+            return None
+        links = ''.join(f'<li><a href="/tr/{slug}/{case_slug}">{case["case_id"]}</a></li>'
+                        for case_slug, case in self.cases[slug].items())
+        return f"<html><body><h1>{self.areas[slug]}</h1><ul>{links}</ul></body></html>"
+
+    def case_page(self, slug: str, case_slug: str, base_url: str) -> Optional[str]:
+        case = self.cases.get(slug, {}).get(case_slug)
+        if case is None:
+            return None
+        data_url = f"{base_url}/data/tr/{slug}/{case_slug}"
+        links = f'<a href="{data_url}/Forundersokning_FUP.pdf">Förundersökning</a>'
+        if case['has_verdict']:
+            links += f'<a href="{data_url}/{self.pdf_name(slug, case_slug)}">Dom</a>'
+        return f"<html><body><h1>{case['case_id']}</h1>{links}</body></html>"
+
+    def verdict_pdf(self, slug: str, case_slug: str) -> Optional[bytes]:
+        case = self.cases.get(slug, {}).get(case_slug)
+        if case is None:
+            return None
+        key = f"{slug}/{case_slug}"
+        with self._lock:
+            if key not in self._pdf_cache:
+                rng = random.Random(f"{self.config.seed}/{key}")
+                self._pdf_cache[key] = make_verdict_pdf(self.areas[slug], case['case_id'], case['date'],
+                                                        case['num_pages'], rng)
+            return self._pdf_cache[key]
+
+    def verdict_links(self, base_url: str) -> List[str]:
+        return [f"{base_url}/data/tr/{slug}/{case_slug}/{self.pdf_name(slug, case_slug)}"
+                for slug, cases in self.cases.items() for case_slug, case in cases.items() if case['has_verdict']]
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockFup/1.0"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    def do_GET(self):
+        server = self.server
+        config = server.site.config
+        with server.stats_lock:
+            server.stats['requests'] += 1
+            roll = server.rng.random()
+
+        delay = config.latency + (server.rng.uniform(0, config.jitter) if config.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if roll < config.rate_limit_rate:
+            self._count('rate_limited')
+            self.send_response(429)
+            self.send_header('Retry-After', str(config.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._count('errors')
+            self._send(500, b"Internal Server Error", 'text/plain')
+            return
+
+        parts = [unquote(part) for part in self.path.split('?')[0].strip('/').split('/')]
+        body, content_type = None, 'text/html; charset=utf-8'
+        if parts == ['tr']:
+            body = server.site.index_page()
+        elif len(parts) == 2 and parts[0] == 'tr':
+            body = server.site.area_page(parts[1])
+        elif len(parts) == 3 and parts[0] == 'tr':
+            body = server.site.case_page(parts[1], parts[2], server.base_url)
+        elif len(parts) == 5 and parts[:2] == ['data', 'tr'] and 'DOM' in parts[4]:
+            body, content_type = server.site.verdict_pdf(parts[2], parts[3]), 'application/pdf'
+
+        if body is None:
+            self._send(404, b"Not Found", 'text/plain')
+            return
+        self._send(200, body.encode('utf-8') if isinstance(body, str) else body, content_type)
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self._count('bytes', len(body))
+
+    def _count(self, key: str, amount: int = 1):
+        with self.server.stats_lock:
+            self.server.stats[key] += amount
+
+class MockFupServer(ThreadingHTTPServer):
+    """Local stand-in for fup.link serving generated areas, cases and PDFs"""
+
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), MockHandler)
+        self.site = MockSite(config)
+        self.base_url = f"http://{host}:{self.server_address[1]}"
+        self.rng = random.Random(config.seed)
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'bytes': 0}
+        self.stats_lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> 'MockFupServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for fup.link")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--areas', type=int, default=5, help="Number of court areas")
+    parser.add_argument('--cases', type=int, default=20, help="Cases per area")
+    parser.add_argument('--min-pages', type=int, default=2)
+    parser.add_argument('--max-pages', type=int, default=12)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra seconds per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(num_areas=args.areas, cases_per_area=args.cases,
+                        pages_per_pdf=(args.min_pages, args.max_pages), latency=args.latency,
+                        jitter=args.jitter, error_rate=args.error_rate,
+                        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, seed=args.seed)
+    server = MockFupServer(config, port=args.port)
+    print(f"Serving mock fup.link on {server.base_url}/tr (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,57 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import time
+import threading
+
+BASE_URL = "https://fup.link"
+
+# Status codes worth retrying, 429 means we are being rate limited
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+# Longest Retry-After we honor, so one bad header cannot stall the crawl
+MAX_RETRY_AFTER = 60
+
+# Request counters, read by the crawler benchmark. fetch is called from
+# several threads there, so updates go through count_request
+http_stats = {'requests': 0, 'retries': 0, 'failures': 0, 'bytes': 0}
+http_stats_lock = threading.Lock()
+
+def count_request(key, amount=1):
+    with http_stats_lock:
+        http_stats[key] += amount
+
+def fetch(url, max_retries=None, backoff=None):
+    """GET a URL, retrying rate limits, server errors and connection errors"""
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    backoff = RETRY_BACKOFF if backoff is None else backoff
+    
+    for attempt in range(max_retries + 1):
+        count_request('requests')
+        try:
+            response = requests.get(url, timeout=30)
+        except requests.RequestException as e:
+            if attempt == max_retries:
+                count_request('failures')
+                raise
+            print(f"Request to {url} failed ({e}), retrying...")
+            response = None
+        
+        if response is not None:
+            count_request('bytes', len(response.content))
+            if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                if response.status_code != 200:
+                    count_request('failures')
+                return response
+        
+        # Honor Retry-After when the server sends one, otherwise back off exponentially
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = min(int(retry_after), MAX_RETRY_AFTER)
+        else:
+            delay = backoff * 2 ** attempt
+        count_request('retries')
+        time.sleep(delay)
 
 def convert_to_url_safe(text):
     # Convert Swedish characters to URL-safe versions
@@ -22,7 +73,7 @@ def convert_to_url_safe(text):
 
 def get_verdict_pdf(url):
     # Send GET request
-    response = requests.get(url)
+    response = fetch(url)
     
     # Check if request was successful
     if response.status_code != 200:
@@ -41,9 +92,9 @@ def get_verdict_pdf(url):
     
     return None
 
-def scrape_court_ids(url, area_name, max_verdicts, current_count):
+def scrape_court_ids(url, area_name, max_verdicts, current_count, base_url=BASE_URL, case_delay=0.5):
     # Send GET request
-    response = requests.get(url)
+    response = fetch(url)
     
     # Check if request was successful
     if response.status_code != 200:
@@ -63,7 +114,7 @@ def scrape_court_ids(url, area_name, max_verdicts, current_count):
         # Look for patterns like "B 1065-19"
         if text.startswith('B ') and '-' in text:
             # Get the case URL
-            case_url = f"https://fup.link/tr/{convert_to_url_safe(area_name)}/{text.lower().replace(' ', '-')}"
+            case_url = f"{base_url}/tr/{convert_to_url_safe(area_name)}/{text.lower().replace(' ', '-')}"
             
             # Get verdict PDF URL
             print(f"Checking verdict for {text}...")
@@ -84,16 +135,16 @@ def scrape_court_ids(url, area_name, max_verdicts, current_count):
                     break
             
             # Add a small delay between case checks
-            time.sleep(0.5)
+            time.sleep(case_delay)
     
     return court_cases, current_count
 
-def scrape_areas(max_total_verdicts=10):
+def scrape_areas(max_total_verdicts=10, base_url=BASE_URL, output_file='verdict_links.json', area_delay=1, case_delay=0.5):
     # URL of the main page
-    url = "https://fup.link/tr"
+    url = f"{base_url}/tr"
     
     # Send GET request
-    response = requests.get(url)
+    response = fetch(url)
     
     # Check if request was successful
     if response.status_code != 200:
@@ -113,27 +164,29 @@ def scrape_areas(max_total_verdicts=10):
             
         area_name = link.text
         # Get area URL
-        area_url = f"https://fup.link{link['href']}"
+        area_url = f"{base_url}{link['href']}"
         
         # Get court cases for this area
         print(f"Scraping court IDs for {area_name}...")
         remaining_verdicts = max_total_verdicts - current_count
-        court_cases, current_count = scrape_court_ids(area_url, area_name, max_total_verdicts, current_count)
+        court_cases, current_count = scrape_court_ids(area_url, area_name, max_total_verdicts, current_count,
+                                                      base_url=base_url, case_delay=case_delay)
         all_court_cases.extend(court_cases)
         
         print(f"Total verdicts found so far: {current_count}/{max_total_verdicts}")
         
         # Add a small delay to be nice to the server
-        time.sleep(1)
+        time.sleep(area_delay)
     
     # Sort court cases by area and then by court_id
     all_court_cases.sort(key=lambda x: (x['area'], x['court_id']))
     
     # Save to JSON file
-    with open('verdict_links.json', 'w', encoding='utf-8') as f:
+    with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(all_court_cases, f, ensure_ascii=False, indent=2)
     
-    print(f"Successfully scraped {len(all_court_cases)} court cases with verdicts and saved to verdict_links.json")
+    print(f"Successfully scraped {len(all_court_cases)} court cases with verdicts and saved to {output_file}")
+    return all_court_cases
 
 if __name__ == "__main__":
     scrape_areas() 
\ No newline at end of file
@@ -0,0 +1,195 @@
+import io
+import os
+import json
+import tarfile
+import zipfile
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+from content_hash import hash_stream
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+# Zip entries whose name is marked as UTF-8, zipfile decodes the others as cp437
+ZIP_UTF8_FLAG = 0x800
+# Bumped when the listing kept in archive_index.json changes shape
+INDEX_VERSION = 2
+
+class ArchiveMember(NamedTuple):
+    """A PDF inside a zip or tar archive.
+
+    offset is where the member starts: the local header for zip members and
+    the data in the (decompressed) stream for tar members. Members of
+    compressed tars are not seekable; reading them out of order means
+    decompressing the archive again from the start. name is the path of
+    the member, entry the name the archive module reads it by. They only
+    differ for zip members whose name was decoded again as UTF-8.
+    """
+    archive: str
+    name: str
+    entry: str
+    offset: int
+    size: int
+    seekable: bool
+
+# A plain path in pdfs/ or a member of an archive
+PdfLocation = Union[str, ArchiveMember]
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+def is_pdf_member(name: str) -> bool:
+    # Skips directories and the resource forks macOS adds to zip files
+    basename = name.rsplit('/', 1)[-1]
+    return basename.lower().endswith('.pdf') and not basename.startswith('._') and not name.startswith('__MACOSX/')
+
+def get_pdf_name(location: PdfLocation) -> str:
+    """The filename a PDF is known by, e.g. area_b_123-45.pdf"""
+    if isinstance(location, ArchiveMember):
+        return location.name.rsplit('/', 1)[-1]
+    return os.path.basename(location)
+
+def get_pdf_size(location: PdfLocation) -> int:
+    if isinstance(location, ArchiveMember):
+        return location.size
+    return os.path.getsize(location)
+
+def decode_zip_name(info: zipfile.ZipInfo) -> str:
+    """The name of a zip entry as it was written.
+
+    Info-ZIP on Linux stores UTF-8 names without setting the UTF-8 flag, so
+    zipfile turns göteborgs_b_1-23.pdf into g├╢teborgs_b_1-23.pdf. Names
+    without the flag are decoded again as UTF-8 when they are valid UTF-8.
+    """
+    if info.flag_bits & ZIP_UTF8_FLAG:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('utf-8')
+    except UnicodeError:
+        return info.filename
+
+def scan_archive(archive_path: str) -> List[Tuple[ArchiveMember, str]]:
+    """Every PDF in an archive with the SHA-256 of its content, in one pass"""
+    members = []
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                name = decode_zip_name(info)
+                if info.is_dir() or not is_pdf_member(name):
+                    continue
+                with archive.open(info) as f:
+                    content_hash = hash_stream(f)
+                members.append((ArchiveMember(archive_path, name, info.filename, info.header_offset, info.file_size, True),
+                                content_hash))
+        return members
+
+    with tarfile.open(archive_path, 'r:*') as archive:
+        seekable = archive_path.lower().endswith('.tar')
+        for info in archive:
+            if not info.isfile() or not is_pdf_member(info.name):
+                continue
+            content_hash = hash_stream(archive.extractfile(info))
+            members.append((ArchiveMember(archive_path, info.name, info.name, info.offset_data, info.size, seekable), content_hash))
+    return members
+
+def load_archive_index(index_file: str) -> Dict[str, Dict]:
+    if not os.path.exists(index_file):
+        return {}
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print(f"Warning: ignoring unreadable archive index {index_file}")
+        return {}
+
+def save_archive_index(index: Dict[str, Dict], index_file: str):
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def index_archives(archive_paths: List[str], index_file: str) -> Tuple[Dict[str, ArchiveMember], Dict[str, str], List[str]]:
+    """Find the PDFs in each archive, reusing the listing of archives that did not change.
+
+    Returns the location and content hash of every PDF by filename, and the
+    names that were skipped because an earlier archive already had them.
+    """
+    index = load_archive_index(index_file)
+    locations: Dict[str, ArchiveMember] = {}
+    file_hashes: Dict[str, str] = {}
+    duplicates = []
+    changed = False
+
+    for archive_path in archive_paths:
+        key = os.path.abspath(archive_path)
+        stat = os.stat(archive_path)
+        cached = index.get(key)
+        # Size and mtime are enough to tell that an archive was not touched since it was listed
+        if not cached or cached['size'] != stat.st_size or cached['mtime_ns'] != stat.st_mtime_ns or \
+                cached.get('version') != INDEX_VERSION:
+            cached = {
+                'version': INDEX_VERSION,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'members': [[member.name, member.entry, member.offset, member.size, member.seekable, content_hash]
+                            for member, content_hash in scan_archive(key)]
+            }
+            index[key] = cached
+            changed = True
+
+        for name, entry, offset, size, seekable, content_hash in cached['members']:
+            member = ArchiveMember(key, name, entry, offset, size, seekable)
+            pdf_file = get_pdf_name(member)
+            if pdf_file in locations:
+                duplicates.append(f"{os.path.basename(archive_path)}:{name}")
+                continue
+            locations[pdf_file] = member
+            file_hashes[pdf_file] = content_hash
+
+    # Archives that are gone are forgotten
+    for key in set(index) - {os.path.abspath(path) for path in archive_paths}:
+        del index[key]
+        changed = True
+    if changed:
+        save_archive_index(index, index_file)
+    return locations, file_hashes, duplicates
+
+# Archives opened by this process: path -> (pid, mtime_ns, open archive).
+# Pool workers are forked with the parent's handles, which share the file
+# offset with the parent, so a handle is only used by the process that opened it
+_open_archives: Dict[str, Tuple[int, int, object]] = {}
+
+def get_open_archive(archive_path: str):
+    mtime_ns = os.stat(archive_path).st_mtime_ns
+    cached = _open_archives.get(archive_path)
+    if cached and cached[0] == os.getpid() and cached[1] == mtime_ns:
+        return cached[2]
+    if cached and cached[0] == os.getpid():
+        cached[2].close()
+    if archive_path.lower().endswith('.zip'):
+        archive = zipfile.ZipFile(archive_path)
+    else:
+        archive = tarfile.open(archive_path, 'r:*')
+    _open_archives[archive_path] = (os.getpid(), mtime_ns, archive)
+    return archive
+
+def read_member(member: ArchiveMember) -> bytes:
+    archive = get_open_archive(member.archive)
+    if isinstance(archive, zipfile.ZipFile):
+        return archive.read(member.entry)
+    # The data of a tar member is stored as is at its offset in the decompressed
+    # stream. Reading members in offset order decompresses a compressed tar once
+    stream = archive.fileobj
+    stream.seek(member.offset)
+    data = stream.read(member.size)
+    if len(data) != member.size:
+        raise IOError(f"{member.name} is truncated in {os.path.basename(member.archive)}")
+    return data
+
+def read_pdf_bytes(location: PdfLocation) -> bytes:
+    if isinstance(location, ArchiveMember):
+        return read_member(location)
+    with open(location, 'rb') as f:
+        return f.read()
+
+def open_pdf(location: PdfLocation):
+    """Binary file object for a PDF wherever it is stored"""
+    if isinstance(location, ArchiveMember):
+        return io.BytesIO(read_member(location))
+    return open(location, 'rb')
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+from array import array
+from datetime import date
+from typing import Dict, List, Optional
+
+from court_cases import KEYWORDS, get_significant_tags
+
+KEYWORD_INDEX = {keyword: i for i, keyword in enumerate(KEYWORDS)}
+HASH_LENGTH = 64
+
+# Key order of a case dict, shared by every case with the same keys
+_layouts: Dict[tuple, tuple] = {}
+
+class NotCompact(ValueError):
+    """A field value that cannot be stored compactly without losing something"""
+
+def encode_tags(tags) -> array:
+    try:
+        return array('B', [KEYWORD_INDEX[tag] for tag in tags])
+    except (KeyError, TypeError):
+        raise NotCompact
+
+def encode_keyword_counts(keyword_counts) -> array:
+    # Only counts above zero, in KEYWORDS order, come back out of the array unchanged
+    try:
+        indices = [KEYWORD_INDEX[keyword] for keyword in keyword_counts]
+        values = array('I', keyword_counts.values())
+    except (KeyError, TypeError, AttributeError, OverflowError):
+        raise NotCompact
+    if indices != sorted(set(indices)) or (values and min(values) == 0) or \
+            any(type(count) is not int for count in keyword_counts.values()):
+        raise NotCompact
+    counts = array('H' if not values or max(values) < 1 << 16 else 'I', [0]) * len(KEYWORDS)
+    for index, count in zip(indices, values):
+        counts[index] = count
+    return counts
+
+def encode_date(value) -> int:
+    # 0 stands for null, real ordinals start at 1
+    if value is None:
+        return 0
+    try:
+        ordinal = date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        raise NotCompact
+    if date.fromordinal(ordinal).isoformat() != value:
+        raise NotCompact
+    return ordinal
+
+def encode_content_hash(value) -> bytes:
+    try:
+        digest = bytes.fromhex(value)
+    except (TypeError, ValueError):
+        raise NotCompact
+    if len(value) != HASH_LENGTH or digest.hex() != value:
+        raise NotCompact
+    return digest
+
+def encode_court_ids(court_ids) -> tuple:
+    if not isinstance(court_ids, list) or not all(isinstance(court_id, str) for court_id in court_ids):
+        raise NotCompact
+    return tuple(court_ids)
+
+def encode_str(value) -> str:
+    if not isinstance(value, str):
+        raise NotCompact
+    return value
+
+def encode_interned(value) -> str:
+    return sys.intern(encode_str(value))
+
+def encode_int(value) -> int:
+    if type(value) is not int:
+        raise NotCompact
+    return value
+
+# JSON key -> (slot, encoder)
+FIELDS = {
+    'court_ids': ('court_ids', encode_court_ids),
+    'area': ('area', encode_interned),
+    'verdict_pdf': ('verdict_pdf', encode_str),
+    'tags': ('_tags', encode_tags),
+    'keyword_counts': ('_counts', encode_keyword_counts),
+    'date': ('_date', encode_date),
+    'num_pages': ('num_pages', encode_int),
+    'filename': ('filename', encode_str),
+    'content_hash': ('_hash', encode_content_hash)
+}
+
+class Case:
+    """One processed case, stored compactly.
+
+    Area strings are interned, tags are indices into KEYWORDS, keyword
+    counts are a fixed-width array in KEYWORDS order and the date is an
+    ordinal. Values that do not fit that form, and keys the model does not
+    know such as related_cases, are kept as loaded in extra, so to_dict
+    gives back exactly the dict from_dict was given, key order included.
+    """
+
+    __slots__ = ('_layout', 'court_ids', 'area', 'verdict_pdf', '_tags', '_counts', '_date',
+                 'num_pages', 'filename', '_hash', 'extra')
+
+    def __init__(self):
+        self._layout = ()
+        self.court_ids = ()
+        self.area = None
+        self.verdict_pdf = None
+        self._tags = None
+        self._counts = None
+        self._date = 0
+        self.num_pages = None
+        self.filename = None
+        self._hash = None
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Case':
+        case = cls()
+        layout = tuple(data)
+        case._layout = _layouts.setdefault(layout, layout)
+        for key, value in data.items():
+            try:
+                slot, encode = FIELDS[key]
+                setattr(case, slot, encode(value))
+            except (KeyError, NotCompact):
+                if case.extra is None:
+                    case.extra = {}
+                case.extra[key] = value
+        return case
+
+    def _get(self, key: str):
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        if key == 'court_ids':
+            return list(self.court_ids)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        return {key: self._get(key) for key in self._layout}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._layout
+
+    def __getitem__(self, key: str):
+        if key not in self._layout:
+            raise KeyError(key)
+        return self._get(key)
+
+    def get(self, key: str, default=None):
+        return self._get(key) if key in self._layout else default
+
+    @property
+    def tags(self) -> List[str]:
+        if self._tags is None:
+            return (self.extra or {}).get('tags', [])
+        return [KEYWORDS[index] for index in self._tags]
+
+    @property
+    def keyword_counts(self) -> Dict[str, int]:
+        if self._counts is None:
+            return (self.extra or {}).get('keyword_counts', {})
+        return {KEYWORDS[index]: count for index, count in enumerate(self._counts) if count}
+
+    @property
+    def date(self) -> Optional[str]:
+        if self.extra is not None and 'date' in self.extra:
+            return self.extra['date']
+        return date.fromordinal(self._date).isoformat() if self._date else None
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        if self._hash is None:
+            return (self.extra or {}).get('content_hash')
+        return self._hash.hex()
+
+    @property
+    def related_cases(self) -> List[Dict]:
+        return (self.extra or {}).get('related_cases', [])
+
+    def significant_tags(self) -> List[str]:
+        return get_significant_tags(self.tags, self.keyword_counts)
+
+def case_hook(data: Dict):
+    # Nested objects are decoded first, so keyword_counts and related_cases entries stay dicts
+    if 'keyword_counts' in data and 'area' in data:
+        return Case.from_dict(data)
+    return data
+
+def load_cases(input_file: str) -> Dict:
+    """Load a court_cases.json with every case as a Case.
+
+    Cases are converted as the parser produces them, so the dict form of the
+    whole corpus never exists at once.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return json.load(f, object_hook=case_hook)
+
+def dumps_cases(data) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2, default=Case.to_dict)
+
+def dump_cases(data, output_file: str):
+    """Write data in the same format as save_json, turning Case objects back into dicts"""
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=Case.to_dict)
+    os.replace(temp_file, output_file)
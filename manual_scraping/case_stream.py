@@ -0,0 +1,296 @@
+import os
+import csv
+import sys
+import json
+import argparse
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from court_cases import get_significant_tags
+
+# Characters read from the file at a time
+READ_SIZE = 1 << 16
+WHITESPACE = ' \t\n\r'
+
+CSV_FIELDS = ['filename', 'area', 'date', 'num_pages', 'court_ids', 'tags', 'significant_tags', 'verdict_pdf']
+
+class JsonStream:
+    """Decodes JSON values one at a time from a file without reading all of it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays about one value long
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next character that is not whitespace, or '' at the end of the file"""
+        if self.pos < len(self.buffer) and self.buffer[self.pos] not in WHITESPACE:
+            return self.buffer[self.pos]
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at character {self.pos}, found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut off by the end of the buffer still decodes, so
+            # only trust a value that ends before the data read so far
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self) -> Iterator:
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+    def object(self) -> Iterator[str]:
+        """Keys of an object, in file order.
+
+        The value of each key has to be read with value(), array(), object()
+        or skip() before the next key is asked for.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def skip(self):
+        """Read past a value, decoding only one nested value at a time"""
+        char = self.peek()
+        if char == '{':
+            for _ in self.object():
+                self.skip()
+        elif char == '[':
+            for _ in self.array():
+                pass
+        else:
+            self.value()
+
+def iter_output(input_file: str, stream_key: str = 'cases') -> Iterator[Tuple[str, object]]:
+    """Items of a court_cases.json in file order.
+
+    Yields ('case', case) for every element of the cases array, which is
+    never held in memory as a whole, and (key, value) for every other
+    top-level key such as tag_stats.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        stream = JsonStream(f)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == stream_key and stream.peek() == '[':
+                for case in stream.array():
+                    yield 'case', case
+            else:
+                yield key, stream.value()
+            if stream.peek() == ',':
+                stream.pos += 1
+            else:
+                stream.expect('}')
+                return
+
+def iter_cases(input_file: str, metadata: Optional[Dict] = None) -> Iterator[Dict]:
+    """Cases of a court_cases.json or of a JSONL export, one at a time.
+
+    The other top-level keys are stored in metadata when it is given, and
+    are complete once the iterator is exhausted.
+    """
+    if input_file.endswith('.jsonl'):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    for key, value in iter_output(input_file):
+        if key == 'case':
+            yield value
+        elif metadata is not None:
+            metadata[key] = value
+
+def read_metadata(input_file: str) -> Dict:
+    """Every top-level key except cases, such as tag_stats and shard"""
+    return {key: value for key, value in iter_output(input_file) if key != 'case'}
+
+def indent_json(value, level: int) -> str:
+    # Same text json.dump(indent=2) writes for a value nested level deep
+    return json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n' + '  ' * level)
+
+def encode_case(case: Dict) -> str:
+    """Text of a case as an element of the cases array, for OutputWriter.write_encoded"""
+    return indent_json(case, 2)
+
+class OutputWriter:
+    """Writes a court_cases.json one case at a time.
+
+    The result is the same text save_json writes for
+    {'cases': [...], **tail}. As with save_json, the file is written under
+    a temporary name and only replaces output_file once it is complete.
+    """
+
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.temp_file = output_file + '.tmp'
+        self.f = open(self.temp_file, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write_case(self, case: Dict):
+        self.write_encoded(encode_case(case))
+
+    def write_encoded(self, text: str):
+        """Write a case already turned into text by encode_case"""
+        self.f.write('{\n  "cases": [\n    ' if self.count == 0 else ',\n    ')
+        self.f.write(text)
+        self.count += 1
+
+    def write_cases(self, cases: Iterable[Dict]):
+        for case in cases:
+            self.write_case(case)
+
+    def close(self, tail: Optional[Dict] = None):
+        """Finish with the top-level keys that follow cases, such as tag_stats"""
+        self.f.write('{\n  "cases": []' if self.count == 0 else '\n  ]')
+        for key, value in (tail or {}).items():
+            self.f.write(f',\n  {json.dumps(key, ensure_ascii=False)}: {indent_json(value, 1)}')
+        self.f.write('\n}')
+        self.f.close()
+        os.replace(self.temp_file, self.output_file)
+
+    def abort(self):
+        self.f.close()
+        os.remove(self.temp_file)
+
+def compute_stats(cases: Iterable[Dict]) -> Dict:
+    """Totals over the cases, in memory proportional to the number of areas, years and tags"""
+    num_cases = 0
+    num_pages = 0
+    by_area = Counter()
+    by_year = Counter()
+    by_tag = Counter()
+    for case in cases:
+        num_cases += 1
+        num_pages += case.get('num_pages') or 0
+        by_area[case.get('area')] += 1
+        by_year[(case.get('date') or '')[:4] or None] += 1
+        by_tag.update(get_significant_tags(case.get('tags', []), case.get('keyword_counts', {})))
+    return {
+        'cases': num_cases,
+        'pages': num_pages,
+        'cases_per_area': dict(sorted(by_area.items(), key=lambda x: (-x[1], str(x[0])))),
+        'cases_per_year': dict(sorted(by_year.items(), key=lambda x: str(x[0]))),
+        'cases_per_tag': dict(sorted(by_tag.items(), key=lambda x: (-x[1], x[0])))
+    }
+
+def to_csv_row(case: Dict) -> Dict:
+    return {
+        'filename': case.get('filename'),
+        'area': case.get('area'),
+        'date': case.get('date'),
+        'num_pages': case.get('num_pages'),
+        'court_ids': ';'.join(case.get('court_ids', [])),
+        'tags': ';'.join(case.get('tags', [])),
+        'significant_tags': ';'.join(get_significant_tags(case.get('tags', []), case.get('keyword_counts', {}))),
+        'verdict_pdf': case.get('verdict_pdf')
+    }
+
+def export_cases(input_file: str, output, output_format: str) -> int:
+    count = 0
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for case in iter_cases(input_file):
+            writer.writerow(to_csv_row(case))
+            count += 1
+    else:
+        for case in iter_cases(input_file):
+            output.write(json.dumps(case, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_cases = os.path.join(script_dir, 'court_cases.json')
+    parser = argparse.ArgumentParser(description="Read large court_cases.json outputs one case at a time")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = subparsers.add_parser('stats', help="Print case counts per area, year and significant tag")
+    stats_parser.add_argument('cases', nargs='?', default=default_cases, help="court_cases.json or a JSONL export")
+    stats_parser.add_argument('--json', action='store_true', help="Print the stats as JSON")
+
+    export_parser = subparsers.add_parser('export', help="Write the cases as JSON lines or CSV")
+    export_parser.add_argument('cases', nargs='?', default=default_cases, help="court_cases.json to export")
+    export_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    export_parser.add_argument('--output', help="Output file (defaults to standard output)")
+
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        stats = compute_stats(iter_cases(args.cases))
+        if args.json:
+            print(json.dumps(stats, ensure_ascii=False, indent=2))
+            return
+        print(f"{stats['cases']} cases, {stats['pages']} pages")
+        for title, key in [('Cases per area', 'cases_per_area'), ('Cases per year', 'cases_per_year'),
+                           ('Cases per significant tag', 'cases_per_tag')]:
+            print(f"\n{title}:")
+            for name, count in stats[key].items():
+                print(f"{name}: {count}")
+    elif args.command == 'export':
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                count = export_cases(args.cases, f, args.format)
+            print(f"Exported {count} cases to {args.output}")
+        else:
+            export_cases(args.cases, sys.stdout, args.format)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+def hash_stream(f) -> str:
+    """SHA-256 of an open binary file, read in chunks to keep memory flat"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hash_stream(f)
+
+def load_hash_cache(cache_file: str) -> Dict[str, Dict]:
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print(f"Warning: ignoring unreadable hash cache {cache_file}")
+        return {}
+
+def save_hash_cache(cache: Dict[str, Dict], cache_file: str):
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def update_hashes(pdfs_dir: str, pdf_files: List[str], cache: Dict[str, Dict]) -> Tuple[Dict[str, str], int]:
+    """Hash each file into cache unless it is unchanged since it was hashed.
+
+    Returns the hash of every file and how many had to be read again.
+    """
+    file_hashes = {}
+    rehashed = 0
+
+    for pdf_file in pdf_files:
+        stat = os.stat(os.path.join(pdfs_dir, pdf_file))
+        cached = cache.get(pdf_file)
+        # Size and mtime are enough to tell that a file was not touched since it was hashed
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            file_hashes[pdf_file] = cached['sha256']
+            continue
+
+        file_hashes[pdf_file] = hash_file(os.path.join(pdfs_dir, pdf_file))
+        cache[pdf_file] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_hashes[pdf_file]
+        }
+        rehashed += 1
+    return file_hashes, rehashed
+
+def group_by_hash(file_hashes: Dict[str, str]) -> Dict[str, List[str]]:
+    """Group filenames sharing the same content, each group sorted by filename"""
+    groups: Dict[str, List[str]] = {}
+    for pdf_file in sorted(file_hashes):
+        groups.setdefault(file_hashes[pdf_file], []).append(pdf_file)
+    return groups
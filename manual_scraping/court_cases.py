@@ -0,0 +1,91 @@
+import os
+import json
+from typing import Dict, List
+
+# Keywords to look for in the verdicts
+KEYWORDS = [
+    "bedrägeri",
+    "bokföring",
+    "barn",
+    "förtal",
+    "försök",
+    "grov",
+    "grovt",
+    "hets",
+    "hot",
+    "kroppsskada",
+    "medhjälp",
+    "misshandel",
+    "mord",
+    "narkotika",
+    "rån",
+    "sexuellt",
+    "smuggling",
+    "stöld",
+    "tjänstefel",
+    "tvång",
+    "vapen",
+    "vållande",
+    "våld",
+    "våldtäkt",
+    "övergrepp",
+    "kränkande",
+    # Additional crime types
+    "rattfylleri",
+    "utpressning",
+    "skadegörelse",
+    "penningtvätt",
+    "människohandel",
+    "ofredande",
+    "trakasserier",
+    "dopning",
+    "urkundsförfalskning",
+    "koppleri"
+]
+
+def get_significant_tags(tags: List[str], keyword_counts: Dict[str, int]) -> List[str]:
+    if not tags or not keyword_counts:
+        return []
+
+    # Calculate total mentions
+    total_mentions = sum(keyword_counts.values())
+    
+    # Get the maximum count for any tag
+    max_count = max(keyword_counts.values())
+
+    # Filter tags based on both relative and absolute thresholds
+    return [tag for tag in tags if (
+        keyword_counts[tag] / total_mentions >= 0.05 and  # Relative threshold: 5% of total mentions
+        (keyword_counts[tag] >= 3 or keyword_counts[tag] / max_count >= 0.2)  # Absolute threshold
+    )]
+
+def order_tags(cases_per_tag: Dict[str, int]) -> List[str]:
+    # Most common tags first, ties broken alphabetically
+    return [tag for tag, count in sorted(cases_per_tag.items(), key=lambda x: (-x[1], x[0])) if count > 0]
+
+def build_tag_stats(cases_per_tag: Dict[str, int]) -> Dict:
+    """Build the tag_stats section in a canonical order"""
+    # Key order follows ordered_tags so that the output only depends on the
+    # counts and not on the order in which cases were processed
+    ordered_tags = order_tags(cases_per_tag)
+    return {
+        'cases_per_tag': {tag: cases_per_tag[tag] for tag in ordered_tags},
+        'ordered_tags': ordered_tags
+    }
+
+def build_output(cases: List[Dict], cases_per_tag: Dict[str, int]) -> Dict:
+    return {
+        'cases': cases,
+        'tag_stats': build_tag_stats(cases_per_tag)
+    }
+
+def save_json(data, output_file: str):
+    # Written to a temporary file first so that readers never see a half-written output
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, output_file)
+
+def load_json(input_file: str):
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
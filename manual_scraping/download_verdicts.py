@@ -31,6 +31,10 @@ def get_existing_pdfs(pdfs_dir):
         return set()
     return {f.lower() for f in os.listdir(pdfs_dir) if f.endswith('.pdf')}
 
+def get_verdict_filename(verdict):
+    """Filename a verdict is saved under, lowercased for comparison"""
+    return f"{verdict['area']}_{verdict['case_id'].replace(' ', '_')}.pdf".lower()
+
 def download_verdicts(start_area="malmö", start_case="B 11677-20"):
     verdicts = load_verdicts()
     if not verdicts:
@@ -39,12 +43,26 @@ def download_verdicts(start_area="malmö", start_case="B 11677-20"):
     pdfs_dir = setup_pdfs_folder()
     existing_pdfs = get_existing_pdfs(pdfs_dir)
     
-    # Filter out verdicts that are already downloaded
+    # URLs that are already on disk, possibly under another case ID
+    downloaded_urls = {
+        verdict['verdict_pdf'] for verdict in verdicts
+        if get_verdict_filename(verdict) in existing_pdfs
+    }
+    
+    # Filter out verdicts that are already downloaded. Several case IDs can
+    # point to the same verdict PDF, which only needs to be fetched once.
+    # This only matches on URL: identical PDFs served from different URLs
+    # are downloaded again and deduplicated by content hash in process_verdicts.py
     pending_verdicts = []
+    shared_count = 0
     for verdict in verdicts:
-        filename = f"{verdict['area']}_{verdict['case_id'].replace(' ', '_')}.pdf".lower()
-        if filename not in existing_pdfs:
-            pending_verdicts.append(verdict)
+        if get_verdict_filename(verdict) in existing_pdfs:
+            continue
+        if verdict['verdict_pdf'] in downloaded_urls:
+            shared_count += 1
+            continue
+        downloaded_urls.add(verdict['verdict_pdf'])
+        pending_verdicts.append(verdict)
     
     if not pending_verdicts:
         print("\nAll PDFs have already been downloaded!")
@@ -61,9 +79,10 @@ def download_verdicts(start_area="malmö", start_case="B 11677-20"):
     pending_verdicts = pending_verdicts[start_index:]
     total_verdicts = len(verdicts)
     pending_count = len(pending_verdicts)
-    downloaded_count = total_verdicts - pending_count
+    downloaded_count = total_verdicts - pending_count - shared_count
     
     print(f"\nFound {downloaded_count} already downloaded PDFs")
+    print(f"Skipping {shared_count} verdicts that share a PDF with another case")
     print(f"Need to download {pending_count} PDFs")
     if start_index > 0:
         print(f"Starting from: {start_area} - {start_case}")
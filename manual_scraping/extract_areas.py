@@ -2,10 +2,13 @@ from bs4 import BeautifulSoup
 import os
 import json
 
-def extract_areas():
+def extract_areas(html_file_path=None, json_path=None):
     # Get the directory where this script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    html_file_path = os.path.join(script_dir, 'areas.html')
+    if html_file_path is None:
+        html_file_path = os.path.join(script_dir, 'areas.html')
+    if json_path is None:
+        json_path = os.path.join(script_dir, 'areas.json')
     
     # Read the HTML file
     with open(html_file_path, 'r', encoding='utf-8') as f:
@@ -34,7 +37,6 @@ def extract_areas():
     areas.sort(key=lambda x: x['name'])
     
     # Save to JSON file
-    json_path = os.path.join(script_dir, 'areas.json')
     with open(json_path, 'w', encoding='utf-8') as f:
         json.dump(areas, f, ensure_ascii=False, indent=2)
     
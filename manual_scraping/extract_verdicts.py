@@ -1,16 +1,22 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import os
 import json
 import time
-import keyboard
+import argparse
+from multiprocessing import Pool, cpu_count
+
+def parse_links(html):
+    """All links of a page, the rest of the markup is not built into the tree"""
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('a', href=True))
+    return soup.find_all('a', href=True)
 
 def load_area_cases(area_file):
     """Extract all case URLs from an area HTML file"""
     with open(area_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+        links = parse_links(f.read())
     
     cases = []
-    for link in soup.find_all('a', href=True):
+    for link in links:
         href = link.get('href')
         if href.startswith('/tr/'):
             cases.append({
@@ -19,6 +25,20 @@ def load_area_cases(area_file):
             })
     return cases
 
+def find_verdict_pdf(case_file):
+    """The DOM PDF link of a saved case page, None if the case has no verdict"""
+    with open(case_file, 'r', encoding='utf-8') as f:
+        links = parse_links(f.read())
+    for link in links:
+        href = link.get('href')
+        if href.endswith('.pdf') and 'DOM' in href:
+            return href
+    return None
+
+def get_case_page_path(cases_dir, area, case_url):
+    # cases/<area>/<last part of the case URL>.html
+    return os.path.join(cases_dir, area, case_url.rstrip('/').split('/')[-1] + '.html')
+
 def load_existing_verdicts(script_dir):
     """Load existing verdicts from JSON file if it exists"""
     output_file = os.path.join(script_dir, 'verdicts.json')
@@ -39,6 +59,7 @@ def is_verdict_duplicate(verdict, existing_verdicts):
 def process_areas(start_from="sundsvalls"):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     areas_dir = os.path.join(script_dir, 'areas')
+    cases_dir = os.path.join(script_dir, 'cases')
     
     if not os.path.exists(areas_dir):
         print("Error: areas directory not found. Please run save_area_pages.py first.")
@@ -61,6 +82,9 @@ def process_areas(start_from="sundsvalls"):
     area_files = area_files[start_index:]  # Start from specified area
     print(f"\nStarting from {area_files[0]}")
     
+    # Only the browser automation needs keyboard, the HTML parsing works without it
+    import keyboard
+    
     print("\nStarting browser automation in 5 seconds...")
     print("Make sure Chrome is the active window!")
     print("Press 'q' to quit at any time")
@@ -82,54 +106,49 @@ def process_areas(start_from="sundsvalls"):
                     break
                 
                 print(f"  Checking case {case['case_id']} ({j}/{len(cases)})...")
+                area = area_file.replace('.html', '')
                 
-                # Select URL bar and navigate to case
-                keyboard.press_and_release('ctrl+l')
-                time.sleep(0.5)
-                keyboard.write(case['url'])
-                keyboard.press_and_release('enter')
-                
-                # Wait for page to load
-                print("    Waiting for page to load...")
-                time.sleep(1)
-                
-                # Save page for processing
-                keyboard.press_and_release('ctrl+s')
-                time.sleep(1)
-                
-                # Save to temp file
-                temp_file = os.path.join(script_dir, 'temp_case.html')
-                keyboard.write(temp_file)
-                time.sleep(0.5)
-                keyboard.press_and_release('enter')
-                time.sleep(2)
+                # Case pages are kept so that verdicts.json can be rebuilt offline
+                case_file = get_case_page_path(cases_dir, area, case['url'])
+                if not os.path.exists(case_file):
+                    os.makedirs(os.path.dirname(case_file), exist_ok=True)
+                    
+                    # Select URL bar and navigate to case
+                    keyboard.press_and_release('ctrl+l')
+                    time.sleep(0.5)
+                    keyboard.write(case['url'])
+                    keyboard.press_and_release('enter')
+                    
+                    # Wait for page to load
+                    print("    Waiting for page to load...")
+                    time.sleep(1)
+                    
+                    # Save page for processing
+                    keyboard.press_and_release('ctrl+s')
+                    time.sleep(1)
+                    
+                    keyboard.write(case_file)
+                    time.sleep(0.5)
+                    keyboard.press_and_release('enter')
+                    time.sleep(2)
                 
-                # Read temp file and look for DOM pdf
+                # Read the saved page and look for DOM pdf
                 try:
-                    with open(temp_file, 'r', encoding='utf-8') as f:
-                        soup = BeautifulSoup(f.read(), 'html.parser')
-                    
-                    for link in soup.find_all('a', href=True):
-                        href = link.get('href')
-                        if href.endswith('.pdf') and 'DOM' in href:
-                            verdict = {
-                                'area': area_file.replace('.html', ''),
-                                'case_id': case['case_id'],
-                                'case_url': case['url'],
-                                'verdict_pdf': href
-                            }
-                            if not is_verdict_duplicate(verdict, verdicts):
-                                verdicts.append(verdict)
-                                print(f"    Found new verdict PDF: {href}")
-                            else:
-                                print(f"    Skipping duplicate verdict: {href}")
-                            break
+                    href = find_verdict_pdf(case_file)
+                    if href:
+                        verdict = {
+                            'area': area,
+                            'case_id': case['case_id'],
+                            'case_url': case['url'],
+                            'verdict_pdf': href
+                        }
+                        if not is_verdict_duplicate(verdict, verdicts):
+                            verdicts.append(verdict)
+                            print(f"    Found new verdict PDF: {href}")
+                        else:
+                            print(f"    Skipping duplicate verdict: {href}")
                 except Exception as e:
                     print(f"    Error processing case HTML: {e}")
-                
-                # Clean up temp file
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
     
     except Exception as e:
         print(f"Error: {e}")
@@ -144,5 +163,102 @@ def process_areas(start_from="sundsvalls"):
         else:
             print("\nNo verdicts found")
 
+def read_case_page(case_file):
+    """Pool worker returning whether the case page was saved and its DOM PDF link"""
+    if not os.path.exists(case_file):
+        return False, None
+    try:
+        return True, find_verdict_pdf(case_file)
+    except Exception as e:
+        print(f"    Error processing {case_file}: {e}")
+        return True, None
+
+def rebuild_verdicts(workers=None, keep_existing=False, output_file=None, replace=False):
+    """Rebuild verdicts.json from the saved area and case pages, without a browser.
+    
+    Pages are parsed by a process pool. Results are merged in area file order
+    and then in the order of the cases on each area page, so the output does
+    not depend on the number of workers.
+    
+    The existing verdicts.json is only replaced when every case page is
+    saved, or when replace is set. Otherwise the verdicts found are added to
+    it, so that a partial set of saved pages does not drop the other cases.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    areas_dir = os.path.join(script_dir, 'areas')
+    cases_dir = os.path.join(script_dir, 'cases')
+    output_file = output_file or os.path.join(script_dir, 'verdicts.json')
+    
+    if not os.path.exists(areas_dir):
+        print("Error: areas directory not found. Please run save_area_pages.py first.")
+        return
+    
+    start_time = time.perf_counter()
+    area_files = sorted(f for f in os.listdir(areas_dir) if f.endswith('.html'))
+    workers = workers or cpu_count()
+    
+    with Pool(workers) as pool:
+        area_cases = pool.map(load_area_cases, [os.path.join(areas_dir, f) for f in area_files])
+        jobs = [
+            (area_file.replace('.html', ''), case)
+            for area_file, cases in zip(area_files, area_cases) for case in cases
+        ]
+        case_files = [get_case_page_path(cases_dir, area, case['url']) for area, case in jobs]
+        # Case pages are small, so hand them out in batches
+        chunksize = max(1, len(case_files) // (workers * 8))
+        pages = pool.map(read_case_page, case_files, chunksize=chunksize)
+    
+    missing = sum(1 for saved, href in pages if not saved)
+    if missing and not replace:
+        keep_existing = True
+    verdicts = load_existing_verdicts(script_dir) if keep_existing else []
+    seen = {(v['area'], v['case_id'], v['verdict_pdf']) for v in verdicts}
+    without_verdict = 0
+    added = 0
+    for (area, case), (saved, href) in zip(jobs, pages):
+        if not saved:
+            continue
+        if not href:
+            without_verdict += 1
+            continue
+        key = (area, case['case_id'], href)
+        if key in seen:
+            continue
+        seen.add(key)
+        verdicts.append({
+            'area': area,
+            'case_id': case['case_id'],
+            'case_url': case['url'],
+            'verdict_pdf': href
+        })
+        added += 1
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"Parsed {len(area_files)} area pages and {len(jobs) - missing} case pages in {elapsed:.2f} s using {workers} processes")
+    print(f"{added} verdicts found, {without_verdict} cases without a verdict, {missing} case pages not saved")
+    if missing and not replace:
+        print("Some case pages are not saved, adding to the existing verdicts.json (use --replace to replace it)")
+    if not verdicts:
+        print("\nNo verdicts found, leaving verdicts.json unchanged")
+        return
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(verdicts, f, ensure_ascii=False, indent=2)
+    print(f"\nSaved {len(verdicts)} verdicts to {output_file}")
+
 if __name__ == "__main__":
-    process_areas() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find the verdict PDF of every case")
+    parser.add_argument('--offline', action='store_true',
+                        help="Rebuild verdicts.json from saved pages in areas/ and cases/ instead of browsing")
+    parser.add_argument('--workers', type=int, help="Processes used with --offline (defaults to all cores)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--keep-existing', action='store_true',
+                      help="With --offline, add to the existing verdicts.json even if every case page is saved")
+    mode.add_argument('--replace', action='store_true',
+                      help="With --offline, replace verdicts.json even if some case pages are not saved")
+    parser.add_argument('--output', help="Where --offline writes the verdicts (defaults to verdicts.json)")
+    args = parser.parse_args()
+    
+    if args.offline:
+        rebuild_verdicts(args.workers, args.keep_existing, args.output, args.replace)
+    else:
+        process_areas()
@@ -4,49 +4,34 @@ import PyPDF2
 import re
 from typing import Optional, Dict, List, Tuple, Set
 from collections import Counter
+from bisect import insort
 import os
+import time
+import queue
+import argparse
 from multiprocessing import Pool, cpu_count
 
-# Keywords to look for in the verdicts
-KEYWORDS = [
-    "bedrägeri",
-    "bokföring",
-    "barn",
-    "förtal",
-    "försök",
-    "grov",
-    "grovt",
-    "hets",
-    "hot",
-    "kroppsskada",
-    "medhjälp",
-    "misshandel",
-    "mord",
-    "narkotika",
-    "rån",
-    "sexuellt",
-    "smuggling",
-    "stöld",
-    "tjänstefel",
-    "tvång",
-    "vapen",
-    "vållande",
-    "våld",
-    "våldtäkt",
-    "övergrepp",
-    "kränkande",
-    # Additional crime types
-    "rattfylleri",
-    "utpressning",
-    "skadegörelse",
-    "penningtvätt",
-    "människohandel",
-    "ofredande",
-    "trakasserier",
-    "dopning",
-    "urkundsförfalskning",
-    "koppleri"
-]
+from court_cases import KEYWORDS, build_output, build_tag_stats, save_json, get_significant_tags
+from case_stream import OutputWriter, encode_case
+from content_hash import load_hash_cache, save_hash_cache, update_hashes, group_by_hash
+from archives import ArchiveMember, is_archive, index_archives, get_pdf_name, get_pdf_size, read_pdf_bytes, open_pdf, PdfLocation
+from result_cache import load_result_cache, save_result_cache, to_cache_entry
+from term_index import TermIndex, tokenize, get_index_dir
+from progress import ProgressReporter, init_worker, report, NORMAL, QUIET, VERBOSE
+from scheduling import CostModel, predict_makespan
+from watch import STABLE_SECONDS, create_watcher, is_watched_file, StabilityTracker
+from snippets import SnippetStore, analyze_pages, merge_page_hits, build_evidence, get_snippets_dir
+from related_cases import (RelatedIndex, SHINGLE_SIZE, shingle_hashes_from_tokens, boundary_shingle_hashes,
+                           signature_from_hashes, get_related_dir, build_related_lookup, get_related_cases)
+from tag_stats import TagStats, tag_state_path, changeset_path, case_fingerprint, save_changeset
+from sharding import parse_shard_spec, select_shard, shard_output_path, build_shard_output, merge_shard_outputs
+
+# Documents with more pages than this are split into page ranges across the pool
+SPLIT_PAGES = 60
+# Pages per range when a document is split
+CHUNK_PAGES = 20
+# Seconds between writes of the caches and indexes in watch mode
+FLUSH_SECONDS = 60.0
 
 def extract_case_ids(text: str) -> List[str]:
     # Regular expression to match case IDs (B followed by space and numbers-numbers)
@@ -98,211 +83,914 @@ def get_sorted_tags(keyword_counts: Dict[str, int]) -> List[str]:
     sorted_keywords = sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)
     return [keyword for keyword, count in sorted_keywords]
 
-def get_significant_tags(tags: List[str], keyword_counts: Dict[str, int]) -> List[str]:
-    if not tags or not keyword_counts:
-        return []
+def extract_pages(pdf_reader, pdf_name: str, start: int, end: int) -> List[Tuple[int, str]]:
+    # Page numbers (from 1) and text of pages start..end-1 that have any text
+    pages = []
+    for i in range(start, end):
+        try:
+            page_text = pdf_reader.pages[i].extract_text()
+            if page_text:
+                pages.append((i + 1, page_text))
+        except Exception as e:
+            report('warning', f"Error on page {i+1} of {pdf_name}: {str(e)}")
+            continue
+        finally:
+            report('page', pdf_name)
+    return pages
+
+def analyze_chunk(pages: List[Tuple[int, str]]) -> Dict:
+    """Counts for a piece of a document that can be summed across pieces.
+
+    Each page ends with a newline in the text, so keywords and tokens never
+    span two pages or pieces. Shingles do, which is why the first and last
+    few tokens are kept for merge_chunks.
+    """
+    text = "".join(page_text + "\n" for _, page_text in pages)
+    tokens = tokenize(text)
+    # Counted page by page for the snippets, the sums equal analyze_text_content(text)
+    page_counts, snippets = analyze_pages(pages, KEYWORDS)
+    return {
+        'text': text,
+        'keyword_counts': {keyword: sum(count for _, count in page_counts[keyword]) for keyword in KEYWORDS if keyword in page_counts},
+        'page_counts': page_counts,
+        'snippets': snippets,
+        'term_counts': dict(Counter(tokens)),
+        'shingles': shingle_hashes_from_tokens(tokens),
+        'head': tokens[:SHINGLE_SIZE - 1],
+        'tail': tokens[-(SHINGLE_SIZE - 1):]
+    }
 
-    # Calculate total mentions
-    total_mentions = sum(keyword_counts.values())
+def merge_chunks(chunks: List[Dict], pdf_name: str, num_pages: int) -> Tuple[List[str], Dict[str, int], Optional[str], Optional[str], List[str], int, Dict[str, int], Optional[List[int]], Dict[str, Dict]]:
+    """Combine analyzed page ranges, in page order, into the result for the whole document"""
+    full_text = "".join(chunk['text'] for chunk in chunks)
+    if not full_text:
+        report('warning', f"Warning: No text could be extracted from {pdf_name}")
+        return [], {}, None, None, [], num_pages, {}, None, {}
+    
+    # Metadata patterns can cross page boundaries, so they run on the joined text
+    case_ids = extract_case_ids(full_text)
+    court_name = extract_court_name(full_text)
+    date = extract_date(full_text)
+    
+    keyword_totals = Counter()
+    term_counts = Counter()
+    shingles = set()
+    # Last SHINGLE_SIZE - 1 tokens of the text so far
+    tail: List[str] = []
+    for chunk in chunks:
+        keyword_totals.update(chunk['keyword_counts'])
+        term_counts.update(chunk['term_counts'])
+        shingles |= chunk['shingles']
+        shingles |= boundary_shingle_hashes(tail, chunk['head'])
+        tail = (tail + chunk['tail'])[-(SHINGLE_SIZE - 1):]
+    
+    # Same order and contents as analyze_text_content on the full text
+    keyword_counts = {keyword: keyword_totals[keyword] for keyword in KEYWORDS if keyword_totals[keyword] > 0}
     
-    # Get the maximum count for any tag
-    max_count = max(keyword_counts.values())
+    # Get sorted tags based on frequency
+    tags = get_sorted_tags(keyword_counts)
+    
+    # Signature for finding related verdicts
+    minhash = signature_from_hashes(shingles)
+    
+    # Where the significant tags were found, with a few snippets each
+    page_counts, snippets = merge_page_hits([(chunk['page_counts'], chunk['snippets']) for chunk in chunks])
+    evidence = build_evidence(get_significant_tags(tags, keyword_counts), page_counts, snippets)
+    
+    return tags, keyword_counts, date, court_name, case_ids, num_pages, dict(term_counts), minhash, evidence
 
-    # Filter tags based on both relative and absolute thresholds
-    return [tag for tag in tags if (
-        keyword_counts[tag] / total_mentions >= 0.05 and  # Relative threshold: 5% of total mentions
-        (keyword_counts[tag] >= 3 or keyword_counts[tag] / max_count >= 0.2)  # Absolute threshold
-    )]
+def analyze_pdf(pdf_reader, pdf_name: str) -> Tuple[List[str], Dict[str, int], Optional[str], Optional[str], List[str], int, Dict[str, int], Optional[List[int]], Dict[str, Dict]]:
+    # Get number of pages
+    num_pages = len(pdf_reader.pages)
+    report('start', pdf_name, num_pages)
+    
+    # Extract text from all pages in one go
+    pages = extract_pages(pdf_reader, pdf_name, 0, num_pages)
+    
+    # A whole document is a single chunk
+    return merge_chunks([analyze_chunk(pages)], pdf_name, num_pages)
 
-def process_local_pdf(pdf_path: str) -> Tuple[List[str], Dict[str, int], Optional[str], Optional[str], List[str], int]:
+def process_local_pdf(pdf_path: PdfLocation, pdf_reader=None) -> Tuple[List[str], Dict[str, int], Optional[str], Optional[str], List[str], int, Dict[str, int], Optional[List[int]], Dict[str, Dict]]:
+    """Parse a PDF given by its path or by its ArchiveMember, or through a reader already open on it"""
+    pdf_name = get_pdf_name(pdf_path)
     try:
-        print(f"Opening PDF: {os.path.basename(pdf_path)}")
-        
+        if pdf_reader is not None:
+            return analyze_pdf(pdf_reader, pdf_name)
         # Open PDF file
-        with open(pdf_path, 'rb') as pdf_file:
-            print("Reading PDF structure...")
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Get number of pages
-            num_pages = len(pdf_reader.pages)
-            print(f"PDF has {num_pages} pages")
-            
-            # Extract text from all pages in one go
-            print("Extracting text from all pages...")
-            full_text = ""
-            for i, page in enumerate(pdf_reader.pages):
-                try:
-                    print(f"Processing page {i+1}/{num_pages}...", end='\r')
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                except Exception as e:
-                    print(f"\nError on page {i+1}: {str(e)}")
-                    continue
-            
-            if not full_text:
-                print("Warning: No text could be extracted from PDF")
-                return [], {}, None, None, [], num_pages
-                
-            print("\nExtracting metadata...")
-            # Extract metadata from full text
-            case_ids = extract_case_ids(full_text)
-            court_name = extract_court_name(full_text)
-            date = extract_date(full_text)
-            
-            print("Analyzing content...")
-            # Analyze text content
-            keyword_counts = analyze_text_content(full_text)
-            
-            # Get sorted tags based on frequency
-            tags = get_sorted_tags(keyword_counts)
-            
-            return tags, keyword_counts, date, court_name, case_ids, num_pages
+        with open_pdf(pdf_path) as pdf_file:
+            return analyze_pdf(PyPDF2.PdfReader(pdf_file), pdf_name)
     except Exception as e:
-        print(f"Error processing PDF {pdf_path}: {str(e)}")
-        return [], {}, None, None, [], 0
+        report('failed', pdf_name, str(e))
+        return [], {}, None, None, [], 0, {}, None, {}
 
 def process_pdf_worker(args):
-    pdf_path, pdf_file = args
+    pdf_path, pdf_file, split_pages = args
     try:
-        tags, keyword_counts, date, court_name, case_ids, num_pages = process_local_pdf(pdf_path)
-        return {
-            'filename': pdf_file,
-            'tags': tags,
-            'keyword_counts': keyword_counts,
-            'date': date,
-            'court_name': court_name,
-            'case_ids': case_ids,
-            'num_pages': num_pages,
-            'success': True
-        }
+        if split_pages:
+            # The reader that counts the pages is also the one that extracts them
+            with open_pdf(pdf_path) as f:
+                pdf_reader = PyPDF2.PdfReader(f)
+                num_pages = len(pdf_reader.pages)
+                # Large documents are handed back to be split into page ranges
+                if num_pages > split_pages:
+                    report('start', pdf_file, num_pages)
+                    return {'filename': pdf_file, 'pdf_path': pdf_path, 'num_pages': num_pages, 'split': True, 'success': True}
+                result = process_local_pdf(pdf_path, pdf_reader)
+        else:
+            result = process_local_pdf(pdf_path)
+        num_pages = result[5]
+        report('done', pdf_file, num_pages)
+        return build_worker_result(pdf_file, result)
     except Exception as e:
-        print(f"Worker error processing {pdf_file}: {str(e)}")
+        report('failed', pdf_file, f"Worker error: {str(e)}")
+        report('done', pdf_file, 0)
         return {
             'filename': pdf_file,
             'success': False
         }
 
-def process_local_verdicts(limit=None):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    pdfs_dir = os.path.join(script_dir, 'pdfs')
-    verdicts_json = os.path.join(script_dir, 'verdicts.json')
-    
-    if not os.path.exists(pdfs_dir):
-        print(f"Error: {pdfs_dir} not found")
-        return
-    
-    if not os.path.exists(verdicts_json):
-        print(f"Error: {verdicts_json} not found")
-        return
-    
-    print("Loading verdicts.json...")
-    # Load verdicts.json to get the fup.link URLs
-    with open(verdicts_json, 'r', encoding='utf-8') as f:
-        verdicts_data = json.load(f)
+# Last document a worker opened for page ranges. Workers usually get several
+# ranges of the same document, and parsing its page tree again each time adds up
+_chunk_document = None
+
+def get_chunk_reader(pdf_path: PdfLocation):
+    global _chunk_document
+    if _chunk_document is None or _chunk_document[0] != pdf_path:
+        _chunk_document = (pdf_path, PyPDF2.PdfReader(io.BytesIO(read_pdf_bytes(pdf_path))))
+    return _chunk_document[1]
+
+def process_chunk_worker(args):
+    pdf_path, pdf_file, start, end, num_pages = args
+    result = {'filename': pdf_file, 'start': start, 'end': end, 'num_pages': num_pages}
+    try:
+        pdf_reader = get_chunk_reader(pdf_path)
+        result['chunk'] = analyze_chunk(extract_pages(pdf_reader, pdf_file, start, end))
+        result['success'] = True
+    except Exception as e:
+        result['error'] = f"Pages {start+1}-{end}: {str(e)}"
+        result['success'] = False
+    return result
+
+def build_worker_result(pdf_file: str, result: Tuple) -> Dict:
+    tags, keyword_counts, date, court_name, case_ids, num_pages, term_counts, minhash, evidence = result
+    return {
+        'filename': pdf_file,
+        'tags': tags,
+        'keyword_counts': keyword_counts,
+        'date': date,
+        'court_name': court_name,
+        'case_ids': case_ids,
+        'num_pages': num_pages,
+        'term_counts': term_counts,
+        'minhash': minhash,
+        'evidence': evidence,
+        'success': True
+    }
+
+def run_pdf_task(task: Tuple[str, tuple]) -> Dict:
+    """Pool entry point for a whole document or a page range, timed for the cost model"""
+    kind, args = task
+    start_time = time.perf_counter()
+    if kind == 'range':
+        result = process_chunk_worker(args)
+    else:
+        result = process_pdf_worker(args)
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+def get_page_ranges(pdf_path: PdfLocation, pdf_file: str, num_pages: int, chunk_pages: int) -> List[Tuple[str, tuple]]:
+    return [('range', (pdf_path, pdf_file, start, min(start + chunk_pages, num_pages), num_pages))
+            for start in range(0, num_pages, chunk_pages)]
+
+def plan_pdf_tasks(pdf_args: List[Tuple[PdfLocation, str]], known_pages: Dict[str, int], cost_model: CostModel,
+                   split_pages: int = SPLIT_PAGES, chunk_pages: int = CHUNK_PAGES) -> List[Tuple[float, Tuple[str, tuple]]]:
+    """Tasks with their predicted seconds, most expensive first.
+
+    Documents whose page count an earlier run recorded are split into page
+    ranges here. The others are counted by the worker, which hands them back
+    to be split if they turn out to be long, see run_pdf_tasks.
+    """
+    chunk_pages = max(1, chunk_pages)
+    planned = []
+    for pdf_path, pdf_file in pdf_args:
+        num_pages = known_pages.get(pdf_file)
+        pages = cost_model.estimate_pages(get_pdf_size(pdf_path), num_pages)
+        if split_pages and num_pages is not None and num_pages > split_pages:
+            for task in get_page_ranges(pdf_path, pdf_file, num_pages, chunk_pages):
+                planned.append((cost_model.estimate_seconds(task[1][3] - task[1][2]), task))
+            continue
+        # Known to be short enough, so the worker does not need to count pages again
+        worker_split = 0 if num_pages is not None else split_pages
+        planned.append((cost_model.estimate_seconds(pages), ('document', (pdf_path, pdf_file, worker_split))))
+    # Longest processing time first, with a fixed order for ties
+    planned.sort(key=lambda item: (-item[0], get_task_key(*item[1])))
+    order_sequential_reads(planned)
+    return planned
+
+def order_sequential_reads(planned: List[Tuple[float, Tuple[str, tuple]]]):
+    """Reorder the tasks of each compressed tar to follow the archive.
+
+    Members of a compressed tar are only cheap to read front to back. Their
+    tasks keep the places the cost order gave them, but those places are
+    filled in archive order, so each worker gets them with increasing
+    offsets and decompresses the archive once.
+    """
+    places: Dict[str, List[int]] = {}
+    for i, (cost, (kind, args)) in enumerate(planned):
+        location = args[0]
+        if isinstance(location, ArchiveMember) and not location.seekable:
+            places.setdefault(location.archive, []).append(i)
+    for positions in places.values():
+        items = sorted((planned[i] for i in positions),
+                       key=lambda item: (item[1][1][0].offset, get_task_key(*item[1])))
+        for i, item in zip(positions, items):
+            planned[i] = item
+
+def run_pdf_tasks(pool, planned: List[Tuple[float, Tuple[str, tuple]]], reporter: ProgressReporter, cost_model: CostModel,
+                  num_processes: int, chunk_pages: int = CHUNK_PAGES) -> Tuple[List[Dict], List[Dict]]:
+    """Run planned tasks on the pool in the given order and merge page ranges back into documents.
+
+    Workers pick up the next task as soon as they finish one, so dispatching
+    the most expensive tasks first keeps a long verdict from being started
+    last. Only a few more tasks than there are workers are handed to the
+    pool at a time, so the page ranges of a document a worker found to be
+    long are queued by their cost among the tasks still waiting rather than
+    after all of them. Returns the document results and the finished tasks
+    with timings.
+    """
+    chunk_pages = max(1, chunk_pages)
+    results = []
+    finished = []
+    ranges: Dict[str, List[Dict]] = {}
+    pending = list(planned)
+    next_task = 0
+    running = 0
+    done = queue.Queue()
     
-    print("Creating URL lookup table...")
-    # Create URL lookup by filename
-    url_lookup = {}
-    for verdict in verdicts_data:
-        filename = f"{verdict['area']}_{verdict['case_id'].replace(' ', '_')}.pdf".lower()
-        url_lookup[filename] = verdict['verdict_pdf']
+    def queue_task(cost: float, task: Tuple[str, tuple]):
+        # Before the first waiting task that is cheaper, after those that cost the same
+        position = next((i for i in range(next_task, len(pending)) if pending[i][0] < cost), len(pending))
+        pending.insert(position, (cost, task))
     
-    # Process PDFs
-    processed_cases = []
-    cases_per_tag = Counter()
+    def collect(result: Dict):
+        finished.append(result)
+        if 'start' in result:
+            ranges.setdefault(result['filename'], []).append(result)
+        elif result.get('split'):
+            # The size estimate was too low, split it now
+            pdf_file, num_pages = result['filename'], result['num_pages']
+            reporter.queue.put(('debug', (f"Splitting {pdf_file} ({num_pages} pages) into ranges of {chunk_pages} pages",)))
+            for task in get_page_ranges(result['pdf_path'], pdf_file, num_pages, chunk_pages):
+                queue_task(cost_model.estimate_seconds(task[1][3] - task[1][2]), task)
+        else:
+            results.append(result)
     
-    print("Scanning PDF directory...")
-    # Get list of PDF files and sort them
-    pdf_files = [f for f in os.listdir(pdfs_dir) if f.lower().endswith('.pdf')]
-    pdf_files.sort()
+    while True:
+        while next_task < len(pending) and running < 2 * num_processes:
+            pool.apply_async(run_pdf_task, (pending[next_task][1],), callback=done.put, error_callback=done.put)
+            next_task += 1
+            running += 1
+        if not running:
+            break
+        result = done.get()
+        running -= 1
+        if isinstance(result, BaseException):
+            raise result
+        collect(result)
     
-    # Limit to first N files (if limit is specified)
-    if limit:
-        pdf_files = pdf_files[:limit]
-    total_files = len(pdf_files)
+    for pdf_file, chunks in sorted(ranges.items()):
+        chunks.sort(key=lambda chunk: chunk['start'])
+        num_pages = chunks[0]['num_pages']
+        failed = [chunk['error'] for chunk in chunks if not chunk['success']]
+        if failed:
+            reporter.queue.put(('failed', (pdf_file, "; ".join(failed))))
+            reporter.queue.put(('done', (pdf_file, 0)))
+            results.append({'filename': pdf_file, 'success': False})
+            continue
+        result = merge_chunks([chunk['chunk'] for chunk in chunks], pdf_file, num_pages)
+        reporter.queue.put(('done', (pdf_file, num_pages)))
+        results.append(build_worker_result(pdf_file, result))
+    return results, finished
+
+def get_task_key(kind: str, args: tuple) -> Tuple[str, Optional[int]]:
+    return (args[1], args[2] if kind == 'range' else None)
+
+def report_cost_model(reporter: ProgressReporter, planned: List[Tuple[float, Tuple[str, tuple]]],
+                      finished: List[Dict], predicted: float, elapsed: float):
+    """Compare predicted and measured run time, per run and per task"""
+    error = (elapsed - predicted) / predicted * 100 if predicted else 0.0
+    reporter.result(f"Processing took {elapsed:.1f} s, predicted {predicted:.1f} s ({error:+.0f}%)")
     
-    print(f"\nProcessing {total_files} PDF files...")
+    predicted_by_task = {get_task_key(task[0], task[1]): cost for cost, task in planned}
+    errors = []
+    for result in finished:
+        key = (result['filename'], result.get('start'))
+        if key in predicted_by_task and not result.get('split'):
+            errors.append((result['seconds'] - predicted_by_task[key], key, predicted_by_task[key], result['seconds']))
+    if errors:
+        total_actual = sum(actual for _, _, _, actual in errors)
+        mean_error = sum(abs(delta) for delta, _, _, _ in errors) / total_actual * 100 if total_actual else 0.0
+        reporter.info(f"Cost model: mean absolute error {mean_error:.0f}% of task time over {len(errors)} tasks")
+        for delta, (pdf_file, start), cost, actual in sorted(errors, key=lambda x: -abs(x[0]))[:5]:
+            name = pdf_file if start is None else f"{pdf_file} from page {start + 1}"
+            reporter.debug(f"  {name}: predicted {cost:.2f} s, took {actual:.2f} s")
+
+def fit_cost_model(cost_model: CostModel, finished: List[Dict], page_sizes: List[Tuple[int, int]]):
+    timings = []
+    for result in finished:
+        if not result['success'] or result.get('split'):
+            continue
+        pages = result['end'] - result['start'] if 'start' in result else result['num_pages']
+        if pages > 0:
+            timings.append((pages, result['seconds']))
+    cost_model.fit_timings(timings)
+    cost_model.fit_page_sizes(page_sizes)
+
+def get_verdict_filename(verdict: Dict) -> str:
+    return f"{verdict['area']}_{verdict['case_id'].replace(' ', '_')}.pdf".lower()
+
+def build_verdict_lookup(verdicts_data: List[Dict]) -> Dict[str, Dict]:
+    # Create verdict lookup by filename
+    return {get_verdict_filename(verdict): verdict for verdict in verdicts_data}
+
+def build_url_index(verdicts_data: List[Dict]) -> Dict[str, List[Dict]]:
+    # Several case IDs can point to the same verdict PDF
+    url_index: Dict[str, List[Dict]] = {}
+    for verdict in verdicts_data:
+        url_index.setdefault(verdict['verdict_pdf'], []).append(verdict)
+    return url_index
+
+def get_linked_case_ids(pdf_files: List[str], verdict_lookup: Dict[str, Dict], url_index: Dict[str, List[Dict]]) -> List[str]:
+    """Case IDs of every verdict that points to the same document as pdf_files"""
+    case_ids = []
+    for pdf_file in pdf_files:
+        verdict = verdict_lookup.get(pdf_file.lower())
+        if not verdict:
+            continue
+        # Verdicts sharing a URL are only downloaded once, so they have no file of their own
+        for linked in url_index.get(verdict['verdict_pdf'], [verdict]):
+            if linked['case_id'] not in case_ids:
+                case_ids.append(linked['case_id'])
+    return case_ids
+
+def merge_case_ids(case_ids: List[str], linked_case_ids: List[str]) -> List[str]:
+    merged = list(case_ids)
+    normalized = {re.sub(r'\s+', ' ', case_id) for case_id in case_ids}
+    for case_id in linked_case_ids:
+        if case_id not in normalized:
+            merged.append(case_id)
+            normalized.add(case_id)
+    return merged
+
+def build_case(pdf_file: str, content_hash: str, result: Dict, group: List[str], verdict_lookup: Dict[str, Dict],
+               url_index: Dict[str, List[Dict]], reporter: ProgressReporter) -> Optional[Dict]:
+    """The published case for one file, or None if the file is left out"""
+    if not result['success']:
+        reporter.warning(f"Skipping failed PDF: {pdf_file}")
+        return None
     
-    # Prepare arguments for parallel processing
-    pdf_args = [(os.path.join(pdfs_dir, pdf_file), pdf_file) for pdf_file in pdf_files]
+    # Skip cases where we couldn't extract the court name
+    if not result['court_name']:
+        reporter.warning(f"Skipping {pdf_file} - Could not determine court name")
+        return None
     
-    # Use half of available CPU cores to avoid overloading
-    num_processes = max(1, cpu_count() // 2)
-    print(f"Using {num_processes} processes for parallel processing")
+    # Every case ID pointing at this document shares the parsed result
+    case_ids = result['case_ids']
+    linked_case_ids = get_linked_case_ids(group, verdict_lookup, url_index)
+    if len(linked_case_ids) > 1:
+        case_ids = merge_case_ids(case_ids, linked_case_ids)
     
-    # Process PDFs in parallel
-    with Pool(num_processes) as pool:
-        results = pool.map(process_pdf_worker, pdf_args)
+    # Get the fup.link URL for this PDF
+    verdict_pdf = verdict_lookup.get(pdf_file.lower(), {}).get('verdict_pdf', "")
+    if not verdict_pdf:
+        reporter.warning(f"Warning: No URL found for {pdf_file}")
     
-    # Process results
-    for result in results:
-        if not result['success']:
-            print(f"Skipping failed PDF: {result['filename']}")
-            continue
-            
-        pdf_file = result['filename']
-        tags = result['tags']
-        keyword_counts = result['keyword_counts']
-        date = result['date']
-        court_name = result['court_name']
-        case_ids = result['case_ids']
-        num_pages = result['num_pages']
+    return {
+        'court_ids': case_ids,
+        'area': result['court_name'],  # No need for the "Unknown" fallback since we skip those
+        'verdict_pdf': verdict_pdf,
+        'tags': result['tags'],
+        'keyword_counts': result['keyword_counts'],
+        'date': result['date'],
+        'num_pages': result['num_pages'],
+        'filename': pdf_file,
+        'content_hash': content_hash
+    }
+
+def get_stats_entry(case: Dict) -> Dict:
+    significant_tags = get_significant_tags(case['tags'], case['keyword_counts'])
+    return {
+        'tags': significant_tags,
+        'fingerprint': case_fingerprint(case, significant_tags),
+        'content_hash': case['content_hash']
+    }
+
+class VerdictProcessor:
+    """Turns the PDFs in pdfs/ into an output file and keeps its caches and indexes in step.
+
+    run() looks at every file, as the process command does. Watch mode keeps
+    the instance between batches and calls run_batch(), which only hashes
+    and parses the files in the batch and only rebuilds the cases that
+    depend on them. The output is then joined from the text of every case
+    kept from earlier batches, and the caches and indexes are written by
+    flush() every so often rather than after each batch.
+    """
+
+    def __init__(self, output_file=None, shard=None, dedupe_stats=False, progress_mode=NORMAL,
+                 split_pages=SPLIT_PAGES, chunk_pages=CHUNK_PAGES, archives=None):
+        self.script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.pdfs_dir = os.path.join(self.script_dir, 'pdfs')
+        self.verdicts_json = os.path.join(self.script_dir, 'verdicts.json')
+        if output_file is None:
+            if shard:
+                output_file = shard_output_path(self.script_dir, shard)
+            else:
+                output_file = os.path.join(self.script_dir, 'court_cases.json')
+        self.output_file = output_file
+        self.shard = shard
+        self.dedupe_stats = dedupe_stats
+        self.progress_mode = progress_mode
+        self.split_pages = split_pages
+        self.chunk_pages = chunk_pages
+        self.archives = archives
+        self.reporter = ProgressReporter(progress_mode)
         
-        # Skip cases where we couldn't extract the court name
-        if not court_name:
-            print(f"Skipping {pdf_file} - Could not determine court name")
-            continue
+        self.hash_cache_file = os.path.join(self.script_dir, 'pdf_hashes.json')
+        self.cache_file = os.path.join(self.script_dir, 'processing_cache.json')
+        self.model_file = os.path.join(self.script_dir, 'cost_model.json')
+        self.index_dir = get_index_dir(output_file)
+        self.related_dir = get_related_dir(output_file)
+        self.state_file = tag_state_path(output_file)
+        
+        # Set by run()
+        self.loaded = False
+        # Caches and indexes changed since they were last written
+        self.dirty: Set[str] = set()
+        self.last_flush = time.monotonic()
+        # Published cases by filename, and their text in the output once encoded
+        self.cases: Dict[str, Dict] = {}
+        self.encoded: Dict[str, str] = {}
+
+    def load_verdicts(self):
+        self.reporter.info("Loading verdicts.json...")
+        self.verdicts_mtime = os.stat(self.verdicts_json).st_mtime_ns
+        # Load verdicts.json to get the fup.link URLs
+        with open(self.verdicts_json, 'r', encoding='utf-8') as f:
+            verdicts_data = json.load(f)
+        
+        self.reporter.info("Creating URL lookup table...")
+        self.verdict_lookup = build_verdict_lookup(verdicts_data)
+        self.url_index = build_url_index(verdicts_data)
+
+    def run(self, limit=None, skip_files=None) -> bool:
+        """Process every PDF, parsing only those the caches and indexes do not have yet"""
+        self.reporter = reporter = ProgressReporter(self.progress_mode)
         
-        # Get significant tags for this case
-        significant_tags = get_significant_tags(tags, keyword_counts)
+        if not os.path.exists(self.pdfs_dir):
+            print(f"Error: {self.pdfs_dir} not found")
+            return False
         
-        # Update cases per tag count
-        cases_per_tag.update({tag: 1 for tag in significant_tags})
+        if not os.path.exists(self.verdicts_json):
+            print(f"Error: {self.verdicts_json} not found")
+            return False
         
-        # Get the fup.link URL for this PDF
-        verdict_pdf = url_lookup.get(pdf_file.lower(), "")
-        if not verdict_pdf:
-            print(f"Warning: No URL found for {pdf_file}")
+        self.load_verdicts()
         
-        # Add metadata to the case
-        processed_case = {
-            'court_ids': case_ids,
-            'area': court_name,  # No need for the "Unknown" fallback since we skip those
-            'verdict_pdf': verdict_pdf,
-            'tags': tags,
-            'keyword_counts': keyword_counts,
-            'date': date,
-            'num_pages': num_pages,
-            'filename': pdf_file
+        reporter.info("Scanning PDF directory...")
+        # Get list of PDF files and sort them
+        pdf_files = [f for f in os.listdir(self.pdfs_dir) if f.lower().endswith('.pdf')]
+        # Files that are still being written, see watch_verdicts
+        if skip_files:
+            pdf_files = [f for f in pdf_files if f not in skip_files]
+        
+        # PDFs in zip and tar archives are read in place, archives in pdfs/ are always included
+        archive_paths = [os.path.join(self.pdfs_dir, f) for f in sorted(os.listdir(self.pdfs_dir)) if is_archive(f)]
+        archive_paths = list(dict.fromkeys(os.path.abspath(path) for path in archive_paths + list(self.archives or [])))
+        locations = {pdf_file: os.path.join(self.pdfs_dir, pdf_file) for pdf_file in pdf_files}
+        self.archive_members, self.member_hashes = {}, {}
+        if archive_paths:
+            reporter.info(f"Listing {len(archive_paths)} archives...")
+            self.archive_members, self.member_hashes, duplicates = index_archives(
+                archive_paths, os.path.join(self.script_dir, 'archive_index.json'))
+            for pdf_file, member in self.archive_members.items():
+                if pdf_file in locations:
+                    duplicates.append(f"{os.path.basename(member.archive)}:{member.name}")
+                else:
+                    locations[pdf_file] = member
+            for duplicate in duplicates:
+                reporter.warning(f"Skipping {duplicate}, a PDF with the same name was found first")
+        pdf_files = sorted(locations)
+        
+        # Limit to first N files (if limit is specified)
+        if limit:
+            pdf_files = pdf_files[:limit]
+        
+        reporter.info("Hashing PDF contents...")
+        self.hash_cache = load_hash_cache(self.hash_cache_file)
+        file_hashes, rehashed = update_hashes(self.pdfs_dir, [f for f in pdf_files if isinstance(locations[f], str)],
+                                              self.hash_cache)
+        if rehashed:
+            self.dirty.add('hashes')
+        file_hashes.update((f, self.member_hashes[f]) for f in pdf_files if isinstance(locations[f], ArchiveMember))
+        
+        # Keep only the files that belong to this shard. Sharding on the content
+        # hash keeps identical PDFs together, so tag counters stay mergeable
+        if self.shard:
+            pdf_files = select_shard(pdf_files, self.shard, key=file_hashes.get)
+            file_hashes = {f: file_hashes[f] for f in pdf_files}
+            reporter.info(f"Shard {self.shard[0]}/{self.shard[1]} owns {len(pdf_files)} files")
+        total_files = len(pdf_files)
+        self.locations = {f: locations[f] for f in pdf_files}
+        self.file_hashes = file_hashes
+        self.hash_groups = group_by_hash(file_hashes)
+        
+        # Parse each distinct document once, and only if it was not parsed by an earlier run
+        self.result_cache = load_result_cache(self.cache_file, KEYWORDS)
+        self.results_by_hash = {
+            content_hash: dict(self.result_cache[content_hash], success=True)
+            for content_hash in self.hash_groups if content_hash in self.result_cache
         }
+        # Documents missing from the term index are parsed again to fill it in
+        self.term_index = TermIndex.load_or_empty(self.index_dir)
+        self.indexed_hashes = self.term_index.live_docs()
+        self.related_index = RelatedIndex.load(self.related_dir)
+        self.snippet_store = SnippetStore.load(get_snippets_dir(self.output_file))
+        self.cost_model = CostModel.load(self.model_file)
+        self.stats = TagStats.load(self.state_file, dedupe=self.dedupe_stats)
+        
+        duplicate_count = total_files - len(self.hash_groups)
+        reporter.info(f"Found {len(self.hash_groups)} unique PDF files ({duplicate_count} duplicates of {total_files}), "
+              f"{len(self.results_by_hash)} already processed")
+        parsed_hashes = self.update_documents(set(self.hash_groups), refit=True)
         
-        processed_cases.append(processed_case)
-        print(f"\nProcessed: {pdf_file}")
-        print(f"Court: {court_name}")
-        print(f"Case IDs: {case_ids}")
-        print(f"Date: {date}")
-        print(f"Pages: {num_pages}")
-        print(f"Keywords: {len(keyword_counts)}")
-        print(f"Significant tags: {significant_tags}")
+        # Process results, fanning each parsed document out to every file with the same content
+        self.cases = {}
+        self.encoded = {}
+        processed_cases = []
+        for pdf_file in pdf_files:
+            content_hash = file_hashes[pdf_file]
+            case = build_case(pdf_file, content_hash, self.results_by_hash[content_hash], self.hash_groups[content_hash],
+                              self.verdict_lookup, self.url_index, reporter)
+            if case is None:
+                continue
+            processed_cases.append(case)
+            self.cases[pdf_file] = case
+            # Only report documents that were parsed in this run
+            if content_hash in parsed_hashes:
+                self.report_case(case)
+        
+        self.related_lookup = build_related_lookup(processed_cases, self.related_index)
+        for case in processed_cases:
+            case['related_cases'] = get_related_cases(case['content_hash'], self.related_index, self.related_lookup)
+        
+        # Update the persisted tag counters with the cases that changed since the last publish
+        changeset = self.stats.sync({pdf_file: get_stats_entry(case) for pdf_file, case in self.cases.items()})
+        
+        if self.shard:
+            output_data = build_shard_output(self.shard, processed_cases, self.stats.cases_per_tag)
+        else:
+            output_data = build_output(processed_cases, self.stats.cases_per_tag)
+        save_json(output_data, self.output_file)
+        self.dirty.add('stats')
+        self.flush()
+        self.loaded = True
+        self.report_changes(changeset)
+        return True
+
+    def run_batch(self, changed: Set[str], removed: Set[str], skip_files=None) -> bool:
+        """Update the output for files in pdfs/ that were added, changed or removed.
+
+        Only the changed files are hashed and only new content is parsed.
+        The cases rebuilt are those of files sharing content with a changed
+        file, whose court_ids can change, and those related to them.
+        """
+        # A new verdicts.json can change the URL and court_ids of any case
+        if not self.loaded or os.stat(self.verdicts_json).st_mtime_ns != self.verdicts_mtime:
+            return self.run(skip_files=skip_files)
+        self.reporter = reporter = ProgressReporter(self.progress_mode)
+        
+        removed = set(removed) | {f for f in changed if not os.path.exists(os.path.join(self.pdfs_dir, f))}
+        changed = sorted(f for f in changed if f not in removed)
+        file_hashes, rehashed = update_hashes(self.pdfs_dir, changed, self.hash_cache)
+        if rehashed:
+            self.dirty.add('hashes')
+        
+        touched = set(changed) | removed
+        affected = set()
+        for pdf_file in sorted(touched):
+            previous = self.file_hashes.pop(pdf_file, None)
+            if previous is not None:
+                self.hash_groups[previous].remove(pdf_file)
+                if not self.hash_groups[previous]:
+                    del self.hash_groups[previous]
+                    self.results_by_hash.pop(previous, None)
+                affected.add(previous)
+            self.locations.pop(pdf_file, None)
+            if pdf_file in file_hashes:
+                location, content_hash = os.path.join(self.pdfs_dir, pdf_file), file_hashes[pdf_file]
+            elif pdf_file in self.archive_members:
+                # The file hid a PDF of the same name in an archive
+                location, content_hash = self.archive_members[pdf_file], self.member_hashes[pdf_file]
+            else:
+                continue
+            self.locations[pdf_file] = location
+            self.file_hashes[pdf_file] = content_hash
+            insort(self.hash_groups.setdefault(content_hash, []), pdf_file)
+            affected.add(content_hash)
+        
+        for content_hash in affected:
+            if content_hash in self.hash_groups and content_hash not in self.results_by_hash and content_hash in self.result_cache:
+                self.results_by_hash[content_hash] = dict(self.result_cache[content_hash], success=True)
+        # Documents whose related verdicts can change, before and after the update
+        related = set(affected)
+        for content_hash in affected:
+            related.update(self.related_index.related.get(content_hash, {}))
+        parsed_hashes = self.update_documents(affected, refit=False)
+        for content_hash in affected:
+            related.update(self.related_index.related.get(content_hash, {}))
+        
+        # Rebuild the cases of every file sharing content with a changed one
+        current = {}
+        for content_hash in sorted(affected):
+            touched.update(self.hash_groups.get(content_hash, []))
+        for pdf_file in sorted(touched):
+            self.cases.pop(pdf_file, None)
+            if pdf_file not in self.file_hashes:
+                continue
+            content_hash = self.file_hashes[pdf_file]
+            case = build_case(pdf_file, content_hash, self.results_by_hash[content_hash], self.hash_groups[content_hash],
+                              self.verdict_lookup, self.url_index, reporter)
+            if case is None:
+                continue
+            self.cases[pdf_file] = case
+            current[pdf_file] = get_stats_entry(case)
+            if content_hash in parsed_hashes:
+                self.report_case(case)
+        
+        # Same entries build_related_lookup gives: the first case of each document that has related ones
+        for content_hash in related:
+            pdf_files = [f for f in self.hash_groups.get(content_hash, []) if f in self.cases]
+            if pdf_files and self.related_index.related.get(content_hash):
+                self.related_lookup[content_hash] = (pdf_files[0], self.cases[pdf_files[0]]['court_ids'])
+            else:
+                self.related_lookup.pop(content_hash, None)
+        for content_hash in related:
+            for pdf_file in self.hash_groups.get(content_hash, []):
+                if pdf_file in self.cases:
+                    self.cases[pdf_file]['related_cases'] = get_related_cases(content_hash, self.related_index, self.related_lookup)
+                    self.encoded.pop(pdf_file, None)
+        for pdf_file in touched - set(self.cases):
+            self.encoded.pop(pdf_file, None)
+        
+        changeset = self.stats.update(current, touched)
+        self.dirty.add('stats')
+        self.write_output()
+        self.report_changes(changeset)
+        return True
+
+    def update_documents(self, content_hashes: Set[str], refit: bool) -> Set[str]:
+        """Parse the documents among content_hashes that a cache or index lacks, and update the indexes.
+
+        Documents no longer in hash_groups are dropped from the indexes.
+        Returns the hashes of the documents that were parsed.
+        """
+        reporter = self.reporter
+        pending_groups = [
+            self.hash_groups[content_hash] for content_hash in sorted(content_hashes)
+            if content_hash in self.hash_groups and (
+                content_hash not in self.results_by_hash or content_hash not in self.indexed_hashes
+                or content_hash not in self.related_index or content_hash not in self.snippet_store)
+        ]
+        reporter.info(f"Processing {len(pending_groups)} new PDF files...")
         
-        # Save progress after each batch
-        output_data = {
-            'cases': processed_cases,
-            'tag_stats': {
-                'cases_per_tag': dict(cases_per_tag),
-                'ordered_tags': [tag for tag, _ in sorted(cases_per_tag.items(), key=lambda x: (-x[1], x[0]))]
-            }
+        new_term_vectors = {}
+        new_signatures = {}
+        new_evidence = {}
+        if pending_groups:
+            for result in self.parse_groups(pending_groups, refit):
+                content_hash = self.file_hashes[result['filename']]
+                self.results_by_hash[content_hash] = result
+                # Failed PDFs are retried on the next run
+                if result['success'] and result['num_pages'] > 0:
+                    self.result_cache[content_hash] = to_cache_entry(result)
+                    new_term_vectors[content_hash] = result['term_counts']
+                    new_signatures[content_hash] = result['minhash']
+                    new_evidence[content_hash] = result['evidence']
+            self.dirty.add('results')
+        
+        # Update the term index if documents were added or removed
+        if new_term_vectors or self.indexed_hashes - self.hash_groups.keys():
+            self.term_index = self.term_index.updated(new_term_vectors, self.hash_groups)
+            self.indexed_hashes = self.term_index.live_docs()
+            self.dirty.add('terms')
+        
+        # Only the new documents are compared, against their LSH bucket neighbours
+        if self.related_index.update(new_signatures, self.hash_groups):
+            self.dirty.add('related')
+        
+        # Only the bucket files of added or removed documents are rewritten
+        self.snippet_store.update(new_evidence, self.hash_groups)
+        return {self.file_hashes[group[0]] for group in pending_groups}
+
+    def parse_groups(self, pending_groups: List[List[str]], refit: bool) -> List[Dict]:
+        """Parse the first file of each group on a process pool.
+
+        With refit, the cost model is fitted to the timings of this run and to
+        every file whose page count is known. Watch batches are too small for
+        that and leave the model as the last full run fitted it.
+        """
+        reporter = self.reporter
+        # Prepare arguments for parallel processing
+        pdf_args = [(self.locations[group[0]], group[0]) for group in pending_groups]
+        
+        # Use half of available CPU cores to avoid overloading
+        num_processes = max(1, cpu_count() // 2)
+        reporter.info(f"Using {num_processes} processes for parallel processing")
+        
+        # Page counts from earlier runs make the cost estimate exact for documents parsed before
+        known_pages = {
+            group[0]: self.result_cache[self.file_hashes[group[0]]]['num_pages'] for group in pending_groups
+            if self.file_hashes[group[0]] in self.result_cache
         }
+        planned = plan_pdf_tasks(pdf_args, known_pages, self.cost_model, self.split_pages, self.chunk_pages)
+        predicted = predict_makespan([cost for cost, task in planned], num_processes)
+        reporter.info(f"Predicted processing time: {predicted:.1f} s for {len(planned)} tasks")
         
-        output_file = os.path.join(script_dir, 'court_cases.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        # Process PDFs in parallel, workers report progress to the reporter over its queue
+        reporter.start(len(pdf_args))
+        start_time = time.perf_counter()
+        try:
+            with Pool(num_processes, initializer=init_worker, initargs=(reporter.queue,)) as pool:
+                results, finished = run_pdf_tasks(pool, planned, reporter, self.cost_model, num_processes, self.chunk_pages)
+                # Let the workers exit on their own so their last events reach the reporter
+                pool.close()
+                pool.join()
+        finally:
+            reporter.stop()
+        report_cost_model(reporter, planned, finished, predicted, time.perf_counter() - start_time)
+        
+        if refit:
+            # Refit the model on this run's timings and on every file whose page count is known
+            page_sizes = [
+                (get_pdf_size(self.locations[group[0]]), self.results_by_hash[content_hash]['num_pages'])
+                for content_hash, group in self.hash_groups.items() if content_hash in self.results_by_hash
+            ]
+            page_sizes += [
+                (get_pdf_size(self.locations[result['filename']]), result['num_pages'])
+                for result in results if result['success'] and self.file_hashes[result['filename']] not in self.results_by_hash
+            ]
+            fit_cost_model(self.cost_model, finished, page_sizes)
+            self.cost_model.save(self.model_file)
+        return results
+
+    def write_output(self):
+        """Write the output from the text of each case, encoding only the cases that changed"""
+        writer = OutputWriter(self.output_file)
+        try:
+            for pdf_file in sorted(self.cases):
+                if pdf_file not in self.encoded:
+                    self.encoded[pdf_file] = encode_case(self.cases[pdf_file])
+                writer.write_encoded(self.encoded[pdf_file])
+        except BaseException:
+            writer.abort()
+            raise
+        tail = {'tag_stats': build_tag_stats(self.stats.cases_per_tag)}
+        if self.shard:
+            tail['shard'] = {'index': self.shard[0], 'count': self.shard[1]}
+        writer.close(tail)
+
+    def flush(self):
+        """Write the caches, indexes and tag state that changed since the last flush"""
+        if 'hashes' in self.dirty:
+            save_hash_cache(self.hash_cache, self.hash_cache_file)
+        if 'results' in self.dirty:
+            save_result_cache(self.result_cache, self.cache_file, KEYWORDS)
+        if 'terms' in self.dirty:
+            self.term_index.save(self.index_dir)
+        if 'related' in self.dirty:
+            self.related_index.save(self.related_dir)
+        if 'stats' in self.dirty:
+            self.stats.save(self.state_file)
+        self.dirty = set()
+        self.last_flush = time.monotonic()
+
+    def report_case(self, case: Dict):
+        significant_tags = get_significant_tags(case['tags'], case['keyword_counts'])
+        self.reporter.debug(f"Processed: {case['filename']} | Court: {case['area']} | Case IDs: {case['court_ids']} | "
+                            f"Date: {case['date']} | Pages: {case['num_pages']} | Keywords: {len(case['keyword_counts'])} | "
+                            f"Significant tags: {significant_tags}")
+
+    def report_changes(self, changeset: Dict[str, List[str]]):
+        save_changeset(changeset, changeset_path(self.output_file))
+        reporter = self.reporter
+        reporter.result(f"Saved {len(self.cases)} verdicts to {self.output_file}")
+        reporter.result(f"Changes since last run: {len(changeset['added'])} added, "
+                        f"{len(changeset['modified'])} modified, {len(changeset['removed'])} removed")
+        reporter.info("\nNumber of cases per significant tag:")
+        for tag, count in sorted(self.stats.cases_per_tag.items(), key=lambda x: (-x[1], x[0])):
+            reporter.info(f"{tag}: {count} cases")
+
+def process_local_verdicts(limit=None, shard=None, output_file=None, dedupe_stats=False, progress_mode=NORMAL,
+                           split_pages=SPLIT_PAGES, chunk_pages=CHUNK_PAGES, skip_files=None, archives=None):
+    processor = VerdictProcessor(output_file, shard, dedupe_stats, progress_mode, split_pages, chunk_pages, archives)
+    processor.run(limit, skip_files)
+
+def watch_verdicts(output_file=None, dedupe_stats=False, progress_mode=QUIET, use_polling=False,
+                   stable_seconds=STABLE_SECONDS, split_pages=SPLIT_PAGES, chunk_pages=CHUNK_PAGES,
+                   flush_seconds=FLUSH_SECONDS):
+    """Keep the output up to date while download_verdicts.py is still saving PDFs.
+
+    The first batch is a full run. Later batches go through run_batch, so
+    their cost depends on the number of files in them rather than on the
+    size of the corpus. The caches and indexes are written every
+    flush_seconds and when watching stops.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    pdfs_dir = os.path.join(script_dir, 'pdfs')
+    os.makedirs(pdfs_dir, exist_ok=True)
+    
+    watcher = create_watcher(pdfs_dir, use_polling)
+    tracker = StabilityTracker(pdfs_dir, stable_seconds)
+    processor = VerdictProcessor(output_file, dedupe_stats=dedupe_stats, progress_mode=progress_mode,
+                                 split_pages=split_pages, chunk_pages=chunk_pages)
+    # Files already on disk are picked up by the first batch
+    tracker.touch(f for f in os.listdir(pdfs_dir) if is_watched_file(f))
+    print(f"Watching {pdfs_dir} ({watcher.name}), press Ctrl+C to stop")
+    
+    try:
+        while True:
+            # Wake up regularly while files are settling, otherwise wait for the next change or flush
+            timeout = stable_seconds / 2 if tracker.pending else None
+            if processor.dirty:
+                until_flush = max(0.0, processor.last_flush + flush_seconds - time.monotonic())
+                timeout = until_flush if timeout is None else min(timeout, until_flush)
+            tracker.touch(name for name in watcher.wait(timeout) if is_watched_file(name))
+            ready, removed = tracker.pop_ready()
+            if ready or removed:
+                print(f"\n{len(ready)} new or changed and {len(removed)} removed PDFs")
+                processor.run_batch(ready, removed, skip_files=tracker.unstable())
+            if processor.dirty and time.monotonic() - processor.last_flush >= flush_seconds:
+                processor.flush()
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        if processor.dirty:
+            processor.flush()
+        watcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Process downloaded verdict PDFs into court_cases.json")
+    subparsers = parser.add_subparsers(dest='command')
+
+    process_parser = subparsers.add_parser('process', help="Process PDFs in the pdfs directory (default)")
+    process_parser.add_argument('--limit', type=int, help="Only process the first N files")
+    process_parser.add_argument('--shard', type=parse_shard_spec, metavar='i/N',
+                                help="Only process files in shard i of N and write a partial output")
+    process_parser.add_argument('--output', help="Output file (defaults to court_cases.json or the shard file)")
+    verbosity = process_parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', dest='progress_mode', action='store_const', const=QUIET, default=NORMAL,
+                           help="Only print warnings and a summary, for cron runs")
+    verbosity.add_argument('--verbose', dest='progress_mode', action='store_const', const=VERBOSE,
+                           help="Also print details for every document")
+    process_parser.add_argument('--dedupe-stats', action='store_true',
+                                help="Count identical PDFs filed under several case IDs only once in tag_stats")
+    process_parser.add_argument('--split-pages', type=int, default=SPLIT_PAGES,
+                                help=f"Split documents with more pages than this across workers, 0 disables (default {SPLIT_PAGES})")
+    process_parser.add_argument('--chunk-pages', type=int, default=CHUNK_PAGES,
+                                help=f"Pages per range when a document is split (default {CHUNK_PAGES})")
+    process_parser.add_argument('--archive', dest='archives', action='append', metavar='PATH',
+                                help="Also read the PDFs in this zip or tar archive, can be repeated. Archives in pdfs/ are always read")
+
+    watch_parser = subparsers.add_parser('watch', help="Process PDFs as soon as they finish downloading")
+    watch_parser.add_argument('--output', help="Output file (defaults to court_cases.json)")
+    watch_parser.add_argument('--verbose', dest='progress_mode', action='store_const', const=NORMAL, default=QUIET,
+                              help="Print the full progress of every batch")
+    watch_parser.add_argument('--dedupe-stats', action='store_true',
+                              help="Count identical PDFs filed under several case IDs only once in tag_stats")
+    watch_parser.add_argument('--polling', action='store_true', help="Poll the directory instead of using inotify")
+    watch_parser.add_argument('--stable-seconds', type=float, default=STABLE_SECONDS,
+                              help=f"Seconds a file must stay unchanged before it is processed (default {STABLE_SECONDS})")
+    watch_parser.add_argument('--flush-seconds', type=float, default=FLUSH_SECONDS,
+                              help=f"Seconds between writes of the caches and indexes (default {FLUSH_SECONDS:g})")
+
+    merge_parser = subparsers.add_parser('merge', help="Merge shard outputs into a single court_cases.json")
+    merge_parser.add_argument('shard_files', nargs='+', help="Shard outputs written by process --shard")
+    merge_parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'court_cases.json'),
+                              help="Merged output file")
+
+    args = parser.parse_args()
 
-    print(f"\nSuccessfully processed {len(processed_cases)} verdicts")
-    print("\nNumber of cases per significant tag:")
-    for tag, count in sorted(cases_per_tag.items(), key=lambda x: (-x[1], x[0])):
-        print(f"{tag}: {count} cases")
+    if args.command == 'merge':
+        merge_shard_outputs(args.shard_files, args.output)
+    elif args.command == 'process':
+        process_local_verdicts(limit=args.limit, shard=args.shard, output_file=args.output,
+                               dedupe_stats=args.dedupe_stats, progress_mode=args.progress_mode,
+                               split_pages=args.split_pages, chunk_pages=args.chunk_pages, archives=args.archives)
+    elif args.command == 'watch':
+        watch_verdicts(output_file=args.output, dedupe_stats=args.dedupe_stats, progress_mode=args.progress_mode,
+                       use_polling=args.polling, stable_seconds=args.stable_seconds, flush_seconds=args.flush_seconds)
+    else:
+        process_local_verdicts()  # Removed the limit to process all files
 
 if __name__ == "__main__":
-    process_local_verdicts()  # Removed the limit to process all files 
\ No newline at end of file
+    main()
@@ -0,0 +1,179 @@
+import sys
+import time
+import queue
+import threading
+from multiprocessing import Queue
+from typing import Optional
+
+QUIET = 'quiet'
+NORMAL = 'normal'
+VERBOSE = 'verbose'
+MODES = (QUIET, NORMAL, VERBOSE)
+
+# Seconds between status lines when the output is not a terminal
+LOG_INTERVAL = 10.0
+# Seconds between redraws of the status line on a terminal
+REDRAW_INTERVAL = 0.25
+
+# Set in each pool worker by init_worker
+_progress_queue: Optional[Queue] = None
+
+def init_worker(progress_queue: Queue):
+    """Pool initializer that lets report() reach the parent's reporter"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def report(event: str, *args):
+    """Send a progress event from a worker to the parent process.
+
+    Events are 'start' (filename, num_pages), 'page' (filename), 'done'
+    (filename, num_pages), 'failed' (filename, message), 'warning'
+    (message) and 'debug' (message). Every document ends with 'done', a
+    failed one reports 'failed' first. Outside a pool this does nothing.
+    """
+    if _progress_queue is not None:
+        _progress_queue.put((event, args))
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class ProgressReporter:
+    """Collects events from all workers and prints one aggregate status.
+
+    quiet only prints warnings and the final summary, normal adds a status
+    line with throughput and ETA, verbose also prints per-document details.
+    """
+
+    def __init__(self, mode: str = NORMAL, stream=None):
+        self.mode = mode
+        self.stream = stream or sys.stdout
+        self.is_tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.queue = Queue()
+        self.total_docs = 0
+        self.done_docs = 0
+        self.failed_docs = 0
+        self.pages = 0
+        self.start_time = None
+        self._last_draw = 0.0
+        self._line_open = False
+        self._thread = None
+        self._stopping = threading.Event()
+        # The reporter thread and the main thread both write to the stream
+        self._lock = threading.Lock()
+
+    def info(self, message: str):
+        if self.mode != QUIET:
+            self._write_line(message)
+
+    def debug(self, message: str):
+        if self.mode == VERBOSE:
+            self._write_line(message)
+
+    def warning(self, message: str):
+        self._write_line(message)
+
+    def result(self, message: str):
+        # Outcome of the run, printed in every mode like warnings
+        self._write_line(message)
+
+    def start(self, total_docs: int):
+        self.total_docs = total_docs
+        self.start_time = time.perf_counter()
+        self._last_draw = self.start_time
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Drain outstanding events and print the summary.
+
+        Call this after the pool is joined, so that the workers have sent all
+        their events. The thread is told to stop with an event rather than a
+        sentinel on the queue, because a worker killed by Pool.terminate()
+        can leave the queue's write lock held.
+        """
+        if self._thread:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._close_line()
+        # The summary is printed in quiet mode too, it is what cron mails
+        if self.start_time is not None:
+            self._write_line(self.summary())
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.start_time
+        return (f"Processed {self.done_docs} documents ({self.pages} pages) in {format_duration(elapsed)}: "
+                f"{self._rate(self.done_docs, elapsed):.2f} docs/s, {self._rate(self.pages, elapsed):.1f} pages/s, "
+                f"{self.failed_docs} failed")
+
+    def handle(self, event: str, args: tuple):
+        if event == 'page':
+            self.pages += 1
+        elif event == 'done':
+            self.done_docs += 1
+            self.debug(f"Done: {args[0]} ({args[1]} pages)")
+        elif event == 'failed':
+            self.failed_docs += 1
+            self.warning(f"Failed: {args[0]}: {args[1]}")
+        elif event == 'warning':
+            self.warning(args[0])
+        elif event == 'start':
+            self.debug(f"Started: {args[0]} ({args[1]} pages)")
+        elif event == 'debug':
+            self.debug(args[0])
+
+    def status(self) -> str:
+        elapsed = time.perf_counter() - self.start_time
+        doc_rate = self._rate(self.done_docs, elapsed)
+        remaining = self.total_docs - self.done_docs
+        eta = format_duration(remaining / doc_rate) if doc_rate else '?'
+        return (f"{self.done_docs}/{self.total_docs} docs, {self.pages} pages, "
+                f"{doc_rate:.2f} docs/s, {self._rate(self.pages, elapsed):.1f} pages/s, "
+                f"{self.failed_docs} failed, ETA {eta}")
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=REDRAW_INTERVAL)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                item = ()
+            if item:
+                self.handle(*item)
+            self._draw()
+
+    def _draw(self):
+        if self.mode == QUIET:
+            return
+        now = time.perf_counter()
+        interval = REDRAW_INTERVAL if self.is_tty else LOG_INTERVAL
+        if now - self._last_draw < interval:
+            return
+        self._last_draw = now
+        if self.is_tty:
+            with self._lock:
+                self.stream.write('\r\033[K' + self.status())
+                self.stream.flush()
+                self._line_open = True
+        else:
+            self._write_line(self.status())
+
+    def _write_line(self, message: str):
+        with self._lock:
+            self._close_line()
+            self.stream.write(message + '\n')
+            self.stream.flush()
+
+    def _close_line(self):
+        # Finish the in-place status line before printing anything else
+        if self._line_open:
+            self.stream.write('\n')
+            self._line_open = False
+
+    @staticmethod
+    def _rate(count: int, elapsed: float) -> float:
+        return count / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,373 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from court_cases import get_significant_tags
+from case_model import Case, load_cases
+
+SORT_ORDERS = ('none', 'newest', 'oldest', 'longest', 'shortest')
+# Defaults of the case browser in page.tsx
+DEFAULT_SORT = 'newest'
+DEFAULT_PER_PAGE = 12
+MAX_PER_PAGE = 100
+CACHE_SIZE = 1024
+# Requests kept for the latency percentiles
+LATENCY_WINDOW = 10000
+# Seconds between checks of whether the cases file was rewritten
+RELOAD_INTERVAL = 1.0
+
+SWEDISH_ALPHABET = 'abcdefghijklmnopqrstuvwxyzåäö'
+
+def swedish_sort_key(text: str) -> List[Tuple[int, int]]:
+    """Sort key matching localeCompare(b, 'sv') for the letters used in tags"""
+    return [(1, SWEDISH_ALPHABET.index(c)) if c in SWEDISH_ALPHABET else (0, ord(c)) for c in text.lower()]
+
+def parse_year(date: Optional[str]) -> Optional[int]:
+    # Same as parseInt(date.split('-')[0]) in page.tsx, where 0 and NaN count as no year
+    if not date:
+        return None
+    match = re.match(r'\s*[+-]?\d+', date.split('-')[0])
+    if not match or int(match.group(0)) == 0:
+        return None
+    return int(match.group(0))
+
+def to_mask(positions: Iterable[int], size: int) -> int:
+    bits = bytearray(size // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+def count_bits(mask: int) -> int:
+    return bin(mask).count('1')
+
+class CaseIndex:
+    """The cases of court_cases.json with a bitset for every filter of the case browser.
+
+    Bit i of a bitset is set when case i matches. A query ANDs the bitsets of
+    its filters, then walks a presorted order of the cases until the
+    requested page is full.
+    """
+
+    def __init__(self, data):
+        # page.tsx accepts both a bare list and the {cases, tag_stats} object
+        self.cases: List[Dict] = data if isinstance(data, list) else data.get('cases', [])
+        self.tag_stats: Dict = {} if isinstance(data, list) else data.get('tag_stats', {})
+        size = len(self.cases)
+        self.all_mask = (1 << size) - 1
+
+        tag_positions: Dict[str, List[int]] = {}
+        area_positions: Dict[str, List[int]] = {}
+        year_positions: Dict[int, List[int]] = {}
+        unique_positions = []
+        seen_ids = set()
+        for i, case in enumerate(self.cases):
+            for tag in get_significant_tags(case.get('tags') or [], case.get('keyword_counts') or {}):
+                tag_positions.setdefault(tag, []).append(i)
+            area_positions.setdefault(case['area'], []).append(i)
+            year = parse_year(case.get('date'))
+            if year is not None:
+                year_positions.setdefault(year, []).append(i)
+            # filteredCases keeps the first case of every group sharing a court ID
+            if not any(court_id in seen_ids for court_id in case['court_ids']):
+                unique_positions.append(i)
+                seen_ids.update(case['court_ids'])
+
+        self.tag_masks = {tag: to_mask(positions, size) for tag, positions in tag_positions.items()}
+        self.area_masks = {area: to_mask(positions, size) for area, positions in area_positions.items()}
+        self.year_masks = {year: to_mask(positions, size) for year, positions in year_positions.items()}
+        self.unique_mask = to_mask(unique_positions, size)
+        self.all_tags = sorted(self.tag_masks, key=swedish_sort_key)
+        self.areas = sorted(self.area_masks)
+        self.min_year = min(self.year_masks) if self.year_masks else None
+        self.max_year = max(self.year_masks) if self.year_masks else None
+
+        # Stable sorts, like Array.prototype.sort. Cases without a date never
+        # pass the year filter, so the date orders can ignore them
+        positions = range(size)
+        dated = [i for i in positions if self.cases[i].get('date')]
+        self.orders = {
+            'none': list(positions),
+            'newest': sorted(dated, key=lambda i: self.cases[i]['date'], reverse=True),
+            'oldest': sorted(dated, key=lambda i: self.cases[i]['date']),
+            'longest': sorted(positions, key=lambda i: self.cases[i]['num_pages'], reverse=True),
+            'shortest': sorted(positions, key=lambda i: self.cases[i]['num_pages'])
+        }
+
+    def filter_mask(self, include: List[str], exclude: List[str], areas: List[str],
+                    year_min: Optional[int], year_max: Optional[int]) -> int:
+        """Cases matching every filter, before deduplication"""
+        mask = self.all_mask
+        for tag in include:
+            mask &= self.tag_masks.get(tag, 0)
+        for tag in exclude:
+            mask &= ~self.tag_masks.get(tag, 0)
+        if areas:
+            area_mask = 0
+            for area in areas:
+                area_mask |= self.area_masks.get(area, 0)
+            mask &= area_mask
+        # Undated cases are always filtered out, as in page.tsx
+        year_mask = 0
+        for year, cases in self.year_masks.items():
+            if (year_min is None or year >= year_min) and (year_max is None or year <= year_max):
+                year_mask |= cases
+        return mask & year_mask
+
+    def query_cases(self, include: List[str], exclude: List[str], areas: List[str],
+                    year_min: Optional[int], year_max: Optional[int], sort: str = DEFAULT_SORT,
+                    page: int = 1, per_page: int = DEFAULT_PER_PAGE) -> Dict:
+        """One page of filteredCases"""
+        mask = self.filter_mask(include, exclude, areas, year_min, year_max) & self.unique_mask
+        total = count_bits(mask)
+        start = (page - 1) * per_page
+        bits = format(mask, 'b')[::-1]
+        matches = []
+        if start < total:
+            for i in self.orders[sort]:
+                if i < len(bits) and bits[i] == '1':
+                    matches.append(i)
+                    if len(matches) == start + per_page:
+                        break
+        return {
+            'cases': [self.cases[i] for i in matches[start:]],
+            'total_matching': total,
+            'total_cases': len(self.cases),
+            'page': page,
+            'per_page': per_page,
+            'total_pages': -(-total // per_page)
+        }
+
+    def available_tags(self, include: List[str], exclude: List[str], areas: List[str],
+                       year_min: Optional[int], year_max: Optional[int]) -> List[str]:
+        """availableTags: tags of the matching cases that are not already selected"""
+        mask = self.filter_mask(include, exclude, areas, year_min, year_max)
+        selected = set(include) | set(exclude)
+        return [tag for tag in self.all_tags if tag not in selected and self.tag_masks[tag] & mask]
+
+    def facets(self) -> Dict:
+        return {
+            'total_cases': len(self.cases),
+            'areas': self.areas,
+            'all_tags': self.all_tags,
+            'min_year': self.min_year,
+            'max_year': self.max_year,
+            'tag_stats': self.tag_stats
+        }
+
+class LRUCache:
+    """Encoded responses for the most recently used queries"""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value: bytes):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class LatencyStats:
+    """Latencies of the most recent requests, for p50 and p99"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+            self.requests += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            samples = sorted(self.samples)
+            requests = self.requests
+        def percentile(p):
+            # Nearest rank
+            return samples[max(0, -(-len(samples) * p // 100) - 1)] * 1000 if samples else None
+        return {'requests': requests, 'p50_ms': percentile(50), 'p99_ms': percentile(99)}
+
+class QueryService:
+    """Answers case browser queries from a CaseIndex, reloading it when the cases file changes"""
+
+    def __init__(self, cases_file: str, cache_size: int = CACHE_SIZE):
+        self.cases_file = cases_file
+        self.cache = LRUCache(cache_size)
+        self.latency = LatencyStats()
+        self.lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.index = None
+        # Bumped on every reload so that cached responses of an older index are never served
+        self.version = 0
+        self.reload()
+
+    def reload(self) -> bool:
+        mtime = os.stat(self.cases_file).st_mtime_ns
+        if mtime == self._mtime:
+            return False
+        # The server holds the whole corpus for as long as it runs, so cases are kept compact
+        index = CaseIndex(load_cases(self.cases_file))
+        with self.lock:
+            self.index, self._mtime = index, mtime
+            self.version += 1
+            self.cache.clear()
+        return True
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_INTERVAL:
+            self._checked = now
+            self.reload()
+
+    def handle(self, path: str, params: Dict[str, List[str]]) -> bytes:
+        """Encoded JSON response for a GET request, raises ValueError for bad parameters"""
+        if path == '/metrics':
+            return self.encode(self.metrics())
+        self.maybe_reload()
+        with self.lock:
+            index, version = self.index, self.version
+        if path == '/facets':
+            key = ('facets',)
+        elif path in ('/cases', '/tags'):
+            filters = parse_filters(params)
+            key = (path,) + tuple(frozenset(v) if isinstance(v, list) else v for v in filters)
+        else:
+            raise LookupError(path)
+
+        cached = self.cache.get((version, key))
+        if cached is not None:
+            return cached
+        if path == '/facets':
+            body = self.encode(index.facets())
+        elif path == '/cases':
+            body = self.encode(index.query_cases(*filters))
+        else:
+            body = self.encode({'available_tags': index.available_tags(*filters[:5])})
+        self.cache.put((version, key), body)
+        return body
+
+    def metrics(self) -> Dict:
+        metrics = self.latency.summary()
+        lookups = self.cache.hits + self.cache.misses
+        metrics.update({
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'cache_hit_rate': self.cache.hits / lookups if lookups else None,
+            'cache_entries': len(self.cache.entries),
+            'total_cases': len(self.index.cases)
+        })
+        return metrics
+
+    @staticmethod
+    def encode(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, default=Case.to_dict).encode('utf-8')
+
+def parse_filters(params: Dict[str, List[str]]) -> Tuple:
+    """include, exclude, areas, year_min, year_max, sort, page and per_page from query parameters.
+
+    Lists can be given as repeated parameters or comma separated.
+    """
+    def values(name):
+        return [value for item in params.get(name, []) for value in item.split(',') if value]
+
+    def number(name, default):
+        raw = params.get(name, [None])[-1]
+        if raw is None or raw == '':
+            return default
+        try:
+            return int(raw)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+
+    sort = params.get('sort', [DEFAULT_SORT])[-1]
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+    page = number('page', 1)
+    per_page = number('per_page', DEFAULT_PER_PAGE)
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        raise ValueError(f"page must be at least 1 and per_page between 1 and {MAX_PER_PAGE}")
+    return (values('include'), values('exclude'), values('area'),
+            number('year_min', None), number('year_max', None), sort, page, per_page)
+
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "DomKollenQuery/1.0"
+
+    def log_message(self, format, *args):
+        # Latency is reported on /metrics instead
+        pass
+
+    def do_GET(self):
+        start_time = time.perf_counter()
+        url = urlparse(self.path)
+        try:
+            body = self.server.service.handle(url.path, parse_qs(url.query))
+            status = 200
+        except ValueError as e:
+            body, status = QueryService.encode({'error': str(e)}), 400
+        except LookupError:
+            body, status = QueryService.encode({'error': "Not found"}), 404
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+        if url.path != '/metrics':
+            self.server.service.latency.record(time.perf_counter() - start_time)
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service: QueryService, host: str = '127.0.0.1', port: int = 8000):
+        super().__init__((host, port), QueryHandler)
+        self.service = service
+
+def main():
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Serve filtered, sorted and paginated court cases over HTTP")
+    parser.add_argument('--cases', default=os.path.join(repo_dir, 'src', 'data', 'court_cases.json'),
+                        help="Processed cases to serve, reloaded when the file changes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="Responses kept in the LRU cache")
+    args = parser.parse_args()
+
+    service = QueryService(args.cases, args.cache_size)
+    server = QueryServer(service, args.host, args.port)
+    print(f"Serving {len(service.index.cases)} cases on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import hashlib
+from array import array
+from bisect import bisect_right
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words per shingle
+SHINGLE_SIZE = 5
+# Signature length, split into BANDS bands of NUM_HASHES // BANDS rows for LSH.
+# With 32 bands of 4 rows, pairs above roughly 0.42 Jaccard become candidates
+NUM_HASHES = 128
+BANDS = 32
+# Minimum estimated similarity for two verdicts to be listed as related
+MIN_SIMILARITY = 0.5
+# Related cases written per case
+MAX_RELATED = 10
+
+VALUE_BITS = 57
+VALUE_MASK = (1 << VALUE_BITS) - 1
+
+# Signatures read at a time when merging the indexes of shards
+READ_DOCS = 4096
+
+def shingle_hash(tokens: List[str]) -> int:
+    shingle = ' '.join(tokens).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'little')
+
+def shingle_hashes_from_tokens(tokens: List[str]) -> set:
+    return {shingle_hash(tokens[i:i + SHINGLE_SIZE]) for i in range(max(0, len(tokens) - SHINGLE_SIZE + 1))}
+
+def boundary_shingle_hashes(left_tail: List[str], right_head: List[str]) -> set:
+    """Shingles spanning the boundary between two consecutive pieces of a text.
+
+    left_tail and right_head are at most SHINGLE_SIZE - 1 tokens long, so
+    every window over their concatenation crosses the boundary.
+    """
+    return shingle_hashes_from_tokens(left_tail + right_head)
+
+def signature_from_hashes(hashes: set) -> Optional[List[int]]:
+    """MinHash signature using one permutation hashing.
+
+    Every shingle is hashed once; the low bits pick one of NUM_HASHES bins
+    and the bin keeps the smallest remaining value. This costs O(shingles)
+    instead of O(shingles * NUM_HASHES). Empty bins borrow the value of the
+    next non-empty bin, offset by the distance, so that the signature stays
+    comparable position by position.
+    """
+    if not hashes:
+        return None
+
+    empty = 1 << 64
+    bins = [empty] * NUM_HASHES
+    for value in hashes:
+        index = value % NUM_HASHES
+        value = (value // NUM_HASHES) & VALUE_MASK
+        if value < bins[index]:
+            bins[index] = value
+
+    signature = list(bins)
+    for i in range(NUM_HASHES):
+        distance = 1
+        while signature[i] == empty:
+            borrowed = bins[(i + distance) % NUM_HASHES]
+            if borrowed != empty:
+                signature[i] = borrowed + (distance << VALUE_BITS)
+            distance += 1
+    return signature
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+class RelatedIndex:
+    """MinHash signatures with an LSH band index and the related pairs found so far.
+
+    Documents are keyed by content hash. Adding a document only compares it
+    with the documents it shares an LSH bucket with, so keeping the index up
+    to date costs about O(new documents) rather than O(corpus squared).
+    """
+
+    def __init__(self):
+        self.signatures: Dict[str, List[int]] = {}
+        self.buckets: Dict[Tuple[int, tuple], set] = {}
+        # Every pair above MIN_SIMILARITY, stored in both directions
+        self.related: Dict[str, Dict[str, float]] = {}
+        # Documents without enough text for a signature
+        self.empty: set = set()
+
+    def __contains__(self, doc: str) -> bool:
+        return doc in self.signatures or doc in self.empty
+
+    def _bands(self, signature: List[int]):
+        rows = NUM_HASHES // BANDS
+        for band in range(BANDS):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+    def add(self, doc: str, signature: List[int]):
+        if doc in self.signatures:
+            self.remove(doc)
+        candidates = set()
+        for key in self._bands(signature):
+            bucket = self.buckets.setdefault(key, set())
+            candidates.update(bucket)
+            bucket.add(doc)
+        self.signatures[doc] = signature
+        self.related[doc] = {}
+
+        for other in candidates:
+            similarity = estimate_similarity(signature, self.signatures[other])
+            if similarity >= MIN_SIMILARITY:
+                self.related[doc][other] = similarity
+                self.related[other][doc] = similarity
+
+    def remove(self, doc: str):
+        signature = self.signatures.pop(doc, None)
+        if signature is None:
+            return
+        for key in self._bands(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc)
+                if not bucket:
+                    del self.buckets[key]
+        for other in self.related.pop(doc, {}):
+            self.related[other].pop(doc, None)
+
+    def update(self, new_signatures: Dict[str, Optional[List[int]]], keep_docs) -> bool:
+        """Drop documents outside keep_docs and add new ones, returning whether anything changed"""
+        keep_docs = set(keep_docs)
+        removed = [doc for doc in list(self.signatures) + list(self.empty) if doc not in keep_docs]
+        for doc in removed:
+            self.remove(doc)
+            self.empty.discard(doc)
+        # Sorted so that the result does not depend on the order of arrival
+        for doc in sorted(new_signatures):
+            if new_signatures[doc] is None:
+                self.remove(doc)
+                self.empty.add(doc)
+            else:
+                self.empty.discard(doc)
+                self.add(doc, new_signatures[doc])
+        return bool(removed or new_signatures)
+
+    def related_docs(self, doc: str) -> List[Tuple[str, float]]:
+        """Related documents, most similar first"""
+        return sorted(self.related.get(doc, {}).items(), key=lambda x: (-x[1], x[0]))
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        docs = sorted(self.signatures)
+        values = array('Q')
+        for doc in docs:
+            values.extend(self.signatures[doc])
+        with open(os.path.join(index_dir, 'signatures.bin'), 'wb') as f:
+            values.tofile(f)
+        with open(os.path.join(index_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'byteorder': sys.byteorder,
+                'params': [SHINGLE_SIZE, NUM_HASHES, BANDS, MIN_SIMILARITY],
+                'docs': docs,
+                'empty': sorted(self.empty),
+                'related': {doc: dict(sorted(self.related[doc].items())) for doc in docs if self.related[doc]}
+            }, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'RelatedIndex':
+        index = cls()
+        meta = load_meta(index_dir)
+        if meta is None:
+            return index
+
+        values = array('Q')
+        with open(os.path.join(index_dir, 'signatures.bin'), 'rb') as f:
+            values.fromfile(f, len(meta['docs']) * NUM_HASHES)
+        if meta['byteorder'] != sys.byteorder:
+            values.byteswap()
+
+        for i, doc in enumerate(meta['docs']):
+            signature = values[i * NUM_HASHES:(i + 1) * NUM_HASHES].tolist()
+            index.signatures[doc] = signature
+            index.related[doc] = {}
+            for key in index._bands(signature):
+                index.buckets.setdefault(key, set()).add(doc)
+        for doc, related in meta['related'].items():
+            index.related[doc] = related
+        index.empty = set(meta['empty'])
+        return index
+
+def load_meta(index_dir: str) -> Optional[Dict]:
+    """index.json of a saved index, or None if there is none that can be used"""
+    index_file = os.path.join(index_dir, 'index.json')
+    if not os.path.exists(index_file):
+        return None
+    with open(index_file, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    # Signatures made with other parameters are not comparable, start over
+    if meta['params'] != [SHINGLE_SIZE, NUM_HASHES, BANDS, MIN_SIMILARITY]:
+        print("MinHash parameters changed, rebuilding related cases")
+        return None
+    return meta
+
+def read_signatures(f, first: int, count: int, byteswap: bool = False) -> array:
+    f.seek(first * NUM_HASHES * 8)
+    values = array('Q')
+    values.fromfile(f, count * NUM_HASHES)
+    if byteswap:
+        values.byteswap()
+    return values
+
+def merge_related_indexes(index_dirs: List[str], output_dir: str) -> RelatedIndex:
+    """Combine the saved indexes of shards that never share a document.
+
+    The signatures are copied into output_dir a block at a time. The pairs
+    within a shard are already known, so only documents of different shards
+    that share an LSH bucket are compared. The buckets are built for one
+    band at a time, from another pass over the copied signatures. Returns an
+    index with only the related pairs, which is all get_related_cases needs.
+    """
+    merged = RelatedIndex()
+    docs: List[str] = []
+    # Position in docs of the first document of each shard
+    starts: List[int] = []
+    os.makedirs(output_dir, exist_ok=True)
+    signatures_file = os.path.join(output_dir, 'signatures.bin')
+    with open(signatures_file, 'wb') as out:
+        for index_dir in index_dirs:
+            meta = load_meta(index_dir)
+            if meta is None:
+                continue
+            with open(os.path.join(index_dir, 'signatures.bin'), 'rb') as f:
+                for first in range(0, len(meta['docs']), READ_DOCS):
+                    count = min(READ_DOCS, len(meta['docs']) - first)
+                    read_signatures(f, first, count, meta['byteorder'] != sys.byteorder).tofile(out)
+            starts.append(len(docs))
+            docs.extend(meta['docs'])
+            merged.related.update(meta['related'])
+            merged.empty.update(meta['empty'])
+
+    rows = NUM_HASHES // BANDS
+    with open(signatures_file, 'rb') as f:
+        for band in range(BANDS):
+            buckets: Dict[bytes, List[int]] = {}
+            for first in range(0, len(docs), READ_DOCS):
+                values = read_signatures(f, first, min(READ_DOCS, len(docs) - first))
+                for i in range(len(values) // NUM_HASHES):
+                    offset = i * NUM_HASHES + band * rows
+                    buckets.setdefault(values[offset:offset + rows].tobytes(), []).append(first + i)
+            for bucket in buckets.values():
+                for a, b in combinations(bucket, 2):
+                    if bisect_right(starts, a) == bisect_right(starts, b):
+                        continue
+                    signature_a, signature_b = read_signatures(f, a, 1), read_signatures(f, b, 1)
+                    # A pair is only compared in the first band it shares
+                    if any(signature_a[i:i + rows] == signature_b[i:i + rows] for i in range(0, band * rows, rows)):
+                        continue
+                    doc_a, doc_b = docs[a], docs[b]
+                    similarity = estimate_similarity(signature_a, signature_b)
+                    if similarity >= MIN_SIMILARITY:
+                        merged.related.setdefault(doc_a, {})[doc_b] = similarity
+                        merged.related.setdefault(doc_b, {})[doc_a] = similarity
+
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'byteorder': sys.byteorder,
+            'params': [SHINGLE_SIZE, NUM_HASHES, BANDS, MIN_SIMILARITY],
+            'docs': docs,
+            'empty': sorted(merged.empty),
+            'related': {doc: dict(sorted(merged.related[doc].items())) for doc in docs if merged.related.get(doc)}
+        }, f)
+    return merged
+
+def get_related_dir(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + '.minhash'
+
+def build_related_lookup(cases: Iterable[Dict], index: RelatedIndex) -> Dict[str, Tuple[str, List[str]]]:
+    """Filename and court IDs to list for each document that is related to another one"""
+    # Identical files share a content hash and are already linked through court_ids
+    lookup: Dict[str, Tuple[str, List[str]]] = {}
+    for case in cases:
+        content_hash = case['content_hash']
+        if content_hash not in lookup and index.related.get(content_hash):
+            lookup[content_hash] = (case['filename'], case['court_ids'])
+    return lookup
+
+def get_related_cases(content_hash: str, index: RelatedIndex, lookup: Dict[str, Tuple[str, List[str]]]) -> List[Dict]:
+    related_cases = []
+    for doc, similarity in index.related_docs(content_hash):
+        if doc not in lookup:
+            continue
+        if len(related_cases) == MAX_RELATED:
+            break
+        filename, court_ids = lookup[doc]
+        related_cases.append({
+            'filename': filename,
+            'court_ids': court_ids,
+            'similarity': round(similarity, 3)
+        })
+    return related_cases
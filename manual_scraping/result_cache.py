@@ -0,0 +1,32 @@
+import os
+import json
+from typing import Dict, List
+
+# Fields of a worker result that only depend on the PDF content
+CACHED_FIELDS = ['tags', 'keyword_counts', 'date', 'court_name', 'case_ids', 'num_pages']
+
+def load_result_cache(cache_file: str, keywords: List[str]) -> Dict[str, Dict]:
+    """Load parsed results keyed by content hash.
+
+    The cache is dropped when the keyword list changed since it was written,
+    because every keyword count would then be stale.
+    """
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print(f"Warning: ignoring unreadable result cache {cache_file}")
+        return {}
+    if data.get('keywords') != keywords:
+        print("Keyword list changed, reprocessing all PDFs")
+        return {}
+    return data.get('results', {})
+
+def save_result_cache(cache: Dict[str, Dict], cache_file: str, keywords: List[str]):
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'keywords': keywords, 'results': cache}, f, ensure_ascii=False)
+
+def to_cache_entry(result: Dict) -> Dict:
+    return {field: result[field] for field in CACHED_FIELDS}
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import random
+import argparse
+from multiprocessing import Pool, cpu_count
+from typing import Dict, List, Optional, Tuple
+
+import PyPDF2
+
+from court_cases import KEYWORDS, get_significant_tags, save_json, load_json
+from progress import ProgressReporter, init_worker, report, NORMAL, QUIET, VERBOSE
+from process_verdicts import analyze_text_content, extract_court_name, extract_date, extract_case_ids, get_sorted_tags
+
+# Pages read per document, documents with fewer pages are read in full
+SAMPLE_PAGES = 8
+# The court, date and case IDs are on the first pages, the outcome on the last
+HEAD_PAGES = 2
+TAIL_PAGES = 1
+# Bootstrap replicates behind each tag confidence
+BOOTSTRAP_ROUNDS = 200
+
+def select_sample_pages(num_pages: int, sample_pages: int, rng: random.Random) -> Tuple[List[int], List[List[int]]]:
+    """Pages to read: the first and last pages, plus one random page from each stratum in between.
+
+    Returns the fixed pages and the strata of the middle pages. The sampled
+    page of each stratum is the first entry of its list.
+    """
+    if num_pages <= sample_pages:
+        return list(range(num_pages)), []
+    head = min(HEAD_PAGES, num_pages)
+    tail = min(TAIL_PAGES, num_pages - head)
+    fixed = list(range(head)) + list(range(num_pages - tail, num_pages))
+    middle = list(range(head, num_pages - tail))
+    num_strata = max(1, min(len(middle), sample_pages - len(fixed)))
+    strata = []
+    for s in range(num_strata):
+        stratum = middle[s * len(middle) // num_strata:(s + 1) * len(middle) // num_strata]
+        sampled = rng.randrange(len(stratum))
+        strata.append([stratum[sampled]] + stratum[:sampled] + stratum[sampled + 1:])
+    return fixed, strata
+
+def estimate_counts(fixed_counts: Dict[str, int], strata: List[Tuple[int, Dict[str, int]]]) -> Dict[str, int]:
+    """Keyword counts for the whole document, in KEYWORDS order like analyze_text_content.
+
+    Each sampled page stands in for every page of its stratum.
+    """
+    totals = dict(fixed_counts)
+    for size, counts in strata:
+        for keyword, count in counts.items():
+            totals[keyword] = totals.get(keyword, 0) + size * count
+    return {keyword: round(totals[keyword]) for keyword in KEYWORDS if round(totals.get(keyword, 0)) > 0}
+
+def tag_confidence(fixed_counts: Dict[str, int], strata: List[Tuple[int, Dict[str, int]]],
+                   significant_tags: List[str], rng: random.Random, rounds: int = BOOTSTRAP_ROUNDS) -> Dict[str, float]:
+    """Estimated probability that each tag is significant in the full document.
+
+    Every bootstrap replicate resamples the sampled middle pages with
+    replacement and recomputes the significant tags from the extrapolated
+    counts. Besides the estimated significant tags, tags that are
+    significant in some replicates are included with their share, so that
+    borderline tags can be shown too. Documents read in full get 1.
+    """
+    if not strata:
+        return {tag: 1.0 for tag in significant_tags}
+    middle_pages = sum(size for size, _ in strata)
+    kept = dict.fromkeys(significant_tags, 0)
+    for _ in range(rounds):
+        pages = [rng.choice(strata)[1] for _ in strata]
+        replicate = estimate_counts(fixed_counts, [(middle_pages / len(pages), counts) for counts in pages])
+        for tag in get_significant_tags(get_sorted_tags(replicate), replicate):
+            kept[tag] = kept.get(tag, 0) + 1
+    return {tag: kept[tag] / rounds for tag in sorted(kept, key=lambda tag: (-kept[tag], tag))}
+
+def extract_page(pdf_reader, pdf_name: str, index: int) -> str:
+    try:
+        page_text = pdf_reader.pages[index].extract_text()
+        return page_text + "\n" if page_text else ""
+    except Exception as e:
+        report('warning', f"Error on page {index+1} of {pdf_name}: {str(e)}")
+        return ""
+    finally:
+        report('page', pdf_name)
+
+def sample_pdf(pdf_path: str, sample_pages: int = SAMPLE_PAGES) -> Dict:
+    """Approximate tags of a verdict from a sample of its pages"""
+    pdf_name = os.path.basename(pdf_path)
+    # Seeded by filename so that repeated runs read the same pages
+    rng = random.Random(pdf_name)
+    with open(pdf_path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        num_pages = len(pdf_reader.pages)
+        fixed, strata = select_sample_pages(num_pages, sample_pages, rng)
+        report('start', pdf_name, len(fixed) + len(strata))
+
+        texts = {index: extract_page(pdf_reader, pdf_name, index) for index in fixed + [stratum[0] for stratum in strata]}
+
+    # Metadata comes from the sampled text in page order, the first pages hold it
+    sampled_text = "".join(texts[index] for index in sorted(texts))
+    fixed_counts = analyze_text_content("".join(texts[index] for index in fixed))
+    stratum_counts = [(len(stratum), analyze_text_content(texts[stratum[0]])) for stratum in strata]
+
+    keyword_counts = estimate_counts(fixed_counts, stratum_counts)
+    tags = get_sorted_tags(keyword_counts)
+    significant_tags = get_significant_tags(tags, keyword_counts)
+    return {
+        'filename': pdf_name,
+        'area': extract_court_name(sampled_text) if sampled_text else None,
+        'date': extract_date(sampled_text) if sampled_text else None,
+        'court_ids': extract_case_ids(sampled_text) if sampled_text else [],
+        'num_pages': num_pages,
+        'sampled_pages': sorted(texts),
+        'tags': tags,
+        'keyword_counts': keyword_counts,
+        'significant_tags': significant_tags,
+        'tag_confidence': tag_confidence(fixed_counts, stratum_counts, significant_tags, rng)
+    }
+
+def sample_pdf_worker(args):
+    pdf_path, sample_pages = args
+    pdf_file = os.path.basename(pdf_path)
+    try:
+        result = sample_pdf(pdf_path, sample_pages)
+        report('done', pdf_file, result['num_pages'])
+        return result
+    except Exception as e:
+        report('failed', pdf_file, str(e))
+        report('done', pdf_file, 0)
+        return None
+
+def sample_verdicts(pdf_files: List[str], pdfs_dir: str, sample_pages: int = SAMPLE_PAGES,
+                    progress_mode: str = NORMAL) -> Tuple[List[Dict], float]:
+    """Sampled results for pdf_files, in the same order, and the seconds it took"""
+    reporter = ProgressReporter(progress_mode)
+    num_processes = max(1, cpu_count() // 2)
+    reporter.start(len(pdf_files))
+    start_time = time.perf_counter()
+    try:
+        with Pool(num_processes, initializer=init_worker, initargs=(reporter.queue,)) as pool:
+            results = pool.map(sample_pdf_worker, [(os.path.join(pdfs_dir, f), sample_pages) for f in pdf_files])
+            # Let the workers exit on their own so their last events reach the reporter
+            pool.close()
+            pool.join()
+    finally:
+        reporter.stop()
+    return [result for result in results if result], time.perf_counter() - start_time
+
+def list_pdfs(pdfs_dir: str, limit: Optional[int] = None) -> List[str]:
+    pdf_files = sorted(f for f in os.listdir(pdfs_dir) if f.lower().endswith('.pdf'))
+    return pdf_files[:limit] if limit else pdf_files
+
+def tag_sampled(output_file: str, sample_pages: int = SAMPLE_PAGES, limit: Optional[int] = None,
+                progress_mode: str = NORMAL):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    pdfs_dir = os.path.join(script_dir, 'pdfs')
+    results, elapsed = sample_verdicts(list_pdfs(pdfs_dir, limit), pdfs_dir, sample_pages, progress_mode)
+
+    pages_read = sum(len(result['sampled_pages']) for result in results)
+    total_pages = sum(result['num_pages'] for result in results)
+    save_json({'sample_pages': sample_pages, 'cases': results}, output_file)
+    print(f"Saved {len(results)} sampled verdicts to {output_file}")
+    print(f"Read {pages_read} of {total_pages} pages ({pages_read / max(1, total_pages):.0%}) in {elapsed:.1f} s")
+
+def validate_sampled(cases_file: str, sample_pages: int = SAMPLE_PAGES, limit: Optional[int] = None,
+                     progress_mode: str = QUIET) -> Dict:
+    """Precision and recall of the sampled significant tags against a full run"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    pdfs_dir = os.path.join(script_dir, 'pdfs')
+    full_cases = {case['filename']: case for case in load_json(cases_file)['cases'] if case.get('filename')}
+    pdf_files = [f for f in list_pdfs(pdfs_dir) if f in full_cases][:limit]
+    results, elapsed = sample_verdicts(pdf_files, pdfs_dir, sample_pages, progress_mode)
+
+    true_positives = false_positives = false_negatives = exact = 0
+    per_tag: Dict[str, List[int]] = {}
+    # Confidence bucket -> [sampled tags, of which correct]
+    calibration = {bucket: [0, 0] for bucket in ('<0.5', '0.5-0.8', '0.8-0.95', '>=0.95')}
+    for result in results:
+        case = full_cases[result['filename']]
+        expected = set(get_significant_tags(case['tags'], case['keyword_counts']))
+        predicted = set(result['significant_tags'])
+        true_positives += len(expected & predicted)
+        false_positives += len(predicted - expected)
+        false_negatives += len(expected - predicted)
+        exact += expected == predicted
+        for tag in expected | predicted:
+            stats = per_tag.setdefault(tag, [0, 0, 0])
+            stats[0] += tag in expected and tag in predicted
+            stats[1] += tag in predicted and tag not in expected
+            stats[2] += tag in expected and tag not in predicted
+        # Calibration over every tag with a confidence, including the ones not in significant_tags
+        for tag, confidence in result['tag_confidence'].items():
+            bucket = '<0.5' if confidence < 0.5 else '0.5-0.8' if confidence < 0.8 else '0.8-0.95' if confidence < 0.95 else '>=0.95'
+            calibration[bucket][0] += 1
+            calibration[bucket][1] += tag in expected
+
+    def ratio(a, b):
+        return a / b if b else 1.0
+
+    pages_read = sum(len(result['sampled_pages']) for result in results)
+    total_pages = sum(result['num_pages'] for result in results)
+    summary = {
+        'documents': len(results),
+        'sample_pages': sample_pages,
+        'pages_read': pages_read,
+        'total_pages': total_pages,
+        'seconds': elapsed,
+        'precision': ratio(true_positives, true_positives + false_positives),
+        'recall': ratio(true_positives, true_positives + false_negatives),
+        'exact_match': ratio(exact, len(results)),
+        'per_tag': {tag: {'precision': ratio(tp, tp + fp), 'recall': ratio(tp, tp + fn), 'support': tp + fn}
+                    for tag, (tp, fp, fn) in sorted(per_tag.items())},
+        'calibration': {bucket: {'tags': count, 'significant': ratio(correct, count)}
+                        for bucket, (count, correct) in calibration.items()}
+    }
+
+    print(f"\n{summary['documents']} documents, read {pages_read} of {total_pages} pages "
+          f"({ratio(pages_read, total_pages):.0%}) in {elapsed:.1f} s")
+    print(f"Precision {summary['precision']:.3f}, recall {summary['recall']:.3f}, "
+          f"identical tag sets for {summary['exact_match']:.1%} of documents")
+    print("\nShare of tags that are significant in the full run, by confidence:")
+    for bucket, stats in summary['calibration'].items():
+        if stats['tags']:
+            print(f"  {bucket:>8}: {stats['significant']:.3f} of {stats['tags']} tags")
+    print("\nWorst recall per tag:")
+    for tag, stats in sorted(summary['per_tag'].items(), key=lambda x: (x[1]['recall'], x[0]))[:5]:
+        print(f"  {tag}: precision {stats['precision']:.3f}, recall {stats['recall']:.3f} ({stats['support']} cases)")
+    return summary
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Approximate tags from a sample of each verdict's pages")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    tag_parser = subparsers.add_parser('tag', help="Tag the PDFs in pdfs/ from sampled pages")
+    tag_parser.add_argument('--output', default=os.path.join(script_dir, 'court_cases.sampled.json'))
+    validate_parser = subparsers.add_parser('validate', help="Compare sampled tags with a full run")
+    validate_parser.add_argument('--cases', default=os.path.join(script_dir, 'court_cases.json'),
+                                 help="Output of a full process_verdicts.py run")
+    validate_parser.add_argument('--json', help="Also write the summary to this file")
+    for sub in (tag_parser, validate_parser):
+        sub.add_argument('--sample-pages', type=int, default=SAMPLE_PAGES,
+                         help=f"Pages read per document (default {SAMPLE_PAGES}), at least {HEAD_PAGES + TAIL_PAGES + 1}")
+        sub.add_argument('--limit', type=int, help="Only use the first N files")
+        sub.add_argument('--verbose', dest='progress_mode', action='store_const', const=VERBOSE,
+                         default=NORMAL if sub is tag_parser else QUIET)
+    args = parser.parse_args()
+    sample_pages = max(HEAD_PAGES + TAIL_PAGES + 1, args.sample_pages)
+
+    if args.command == 'tag':
+        tag_sampled(args.output, sample_pages, args.limit, args.progress_mode)
+    else:
+        summary = validate_sampled(args.cases, sample_pages, args.limit, args.progress_mode)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
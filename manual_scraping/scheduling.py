@@ -0,0 +1,88 @@
+import os
+import json
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+# Used until a run has measured the real values
+DEFAULT_BYTES_PER_PAGE = 40000.0
+DEFAULT_SECONDS_PER_PAGE = 0.1
+DEFAULT_SECONDS_PER_TASK = 0.05
+
+class CostModel:
+    """Predicts how long a PDF, or a page range of one, takes to process.
+
+    seconds = seconds_per_task + pages * seconds_per_page. The page count
+    comes from an earlier run when there is one and is estimated from the
+    file size otherwise. All three values are refit after every run.
+    """
+
+    def __init__(self, bytes_per_page: float = DEFAULT_BYTES_PER_PAGE,
+                 seconds_per_page: float = DEFAULT_SECONDS_PER_PAGE,
+                 seconds_per_task: float = DEFAULT_SECONDS_PER_TASK):
+        self.bytes_per_page = bytes_per_page
+        self.seconds_per_page = seconds_per_page
+        self.seconds_per_task = seconds_per_task
+
+    def estimate_pages(self, size: int, known_pages: Optional[int] = None) -> float:
+        if known_pages:
+            return known_pages
+        return max(1.0, size / self.bytes_per_page)
+
+    def estimate_seconds(self, pages: float) -> float:
+        return self.seconds_per_task + pages * self.seconds_per_page
+
+    def fit_page_sizes(self, samples: List[Tuple[int, int]]):
+        """Refit bytes_per_page from (file size, page count) pairs"""
+        total_pages = sum(pages for size, pages in samples if pages > 0)
+        if total_pages:
+            self.bytes_per_page = sum(size for size, pages in samples if pages > 0) / total_pages
+
+    def fit_timings(self, samples: List[Tuple[int, float]]):
+        """Refit the time per page and per task from (pages, seconds) pairs with least squares"""
+        if not samples:
+            return
+        n = len(samples)
+        mean_pages = sum(pages for pages, seconds in samples) / n
+        mean_seconds = sum(seconds for pages, seconds in samples) / n
+        variance = sum((pages - mean_pages) ** 2 for pages, seconds in samples)
+        if variance > 0:
+            slope = sum((pages - mean_pages) * (seconds - mean_seconds) for pages, seconds in samples) / variance
+            intercept = mean_seconds - slope * mean_pages
+            if slope > 0 and intercept >= 0:
+                self.seconds_per_page = slope
+                self.seconds_per_task = intercept
+                return
+        # Too few distinct page counts for a line, keep the overhead and fit the rate
+        if mean_pages > 0:
+            self.seconds_per_page = max(0.0, mean_seconds - self.seconds_per_task) / mean_pages or self.seconds_per_page
+
+    def to_dict(self) -> Dict:
+        return {
+            'bytes_per_page': self.bytes_per_page,
+            'seconds_per_page': self.seconds_per_page,
+            'seconds_per_task': self.seconds_per_task
+        }
+
+    def save(self, model_file: str):
+        with open(model_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, model_file: str) -> 'CostModel':
+        if not os.path.exists(model_file):
+            return cls()
+        try:
+            with open(model_file, 'r', encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except (json.JSONDecodeError, OSError, TypeError):
+            print(f"Warning: ignoring unreadable cost model {model_file}")
+            return cls()
+
+def predict_makespan(costs: List[float], workers: int) -> float:
+    """Wall time when tasks are started in the given order on whichever worker is free first"""
+    if not costs:
+        return 0.0
+    finish_times = [0.0] * max(1, min(workers, len(costs)))
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
@@ -0,0 +1,136 @@
+import os
+import heapq
+import hashlib
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from court_cases import build_output, build_tag_stats
+from case_stream import OutputWriter, iter_cases
+from term_index import get_index_dir, merge_term_indexes
+from related_cases import get_related_dir, merge_related_indexes, build_related_lookup, get_related_cases
+from snippets import get_snippets_dir, merge_snippet_stores
+from tag_stats import (tag_state_path, changeset_path, is_sidecar_path, save_changeset, read_state_header,
+                       iter_state_section, iter_merged_section, diff_cases, write_state)
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """Parse a shard spec like "2/8" into (index, count)"""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec '{spec}', expected i/N")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec '{spec}', index must be in 0..{count - 1}")
+    return index, count
+
+def shard_of(key: str, num_shards: int) -> int:
+    # Use a cryptographic hash instead of hash() so that every host agrees
+    # on the assignment regardless of PYTHONHASHSEED
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return int(digest, 16) % num_shards
+
+def select_shard(items: List[str], shard: Tuple[int, int], key: Callable[[str], str] = None) -> List[str]:
+    index, count = shard
+    return [item for item in items if shard_of(key(item) if key else item, count) == index]
+
+def shard_output_path(output_dir: str, shard: Tuple[int, int]) -> str:
+    index, count = shard
+    return os.path.join(output_dir, f"court_cases.shard-{index}-of-{count}.json")
+
+def build_shard_output(shard: Tuple[int, int], cases: List[Dict], cases_per_tag: Dict[str, int]) -> Dict:
+    index, count = shard
+    output_data = build_output(cases, cases_per_tag)
+    output_data['shard'] = {'index': index, 'count': count}
+    return output_data
+
+def iter_sorted_cases(shard_file: str) -> Iterator[Dict]:
+    """Cases of a shard output, which process writes in filename order"""
+    previous = None
+    for case in iter_cases(shard_file):
+        if previous is not None and case['filename'] <= previous:
+            raise ValueError(f"{shard_file} is not sorted by filename at {case['filename']}")
+        previous = case['filename']
+        yield case
+
+def merge_shard_outputs(shard_files: List[str], output_file: str):
+    """Combine shard outputs into a single court_cases.json.
+
+    Cases and the per-case tag state are streamed from the shards in key
+    order and written one at a time. The term indexes are merged row by row,
+    the MinHash signatures are copied a block at a time and the snippets are
+    combined one bucket file at a time. What is still held in memory grows
+    with the corpus: the content hashes of the documents, the related pairs
+    with the filename and court IDs of every related document, and the LSH
+    buckets of a single band.
+    """
+    dedupe = None
+    cases_per_tag = Counter()
+    seen_shards = set()
+    shard_count = None
+
+    # Globs like court_cases.shard-*.json also pick up the per-shard sidecars
+    shard_files = [f for f in shard_files if not is_sidecar_path(f)]
+
+    state_files = [tag_state_path(f) for f in shard_files]
+    for shard_file, state_file in zip(shard_files, state_files):
+        if not os.path.exists(state_file):
+            raise ValueError(f"{shard_file} has no tag state, expected {state_file}")
+        header = read_state_header(state_file)
+        if dedupe is None:
+            dedupe = header['dedupe']
+        elif header['dedupe'] != dedupe:
+            raise ValueError("Cannot merge tag stats with different dedupe settings")
+        # Duplicates are never split across shards, so the counters simply add up
+        cases_per_tag.update(header['cases_per_tag'])
+
+    # Related verdicts can span shards, so the pairs between shards are looked for here
+    related_index = merge_related_indexes([get_related_dir(f) for f in shard_files], get_related_dir(output_file))
+
+    # First pass over the cases: check the shards and look up the related documents.
+    # Identical files are always in the same shard, so the first case for a content
+    # hash within its shard is also the first in the merged output
+    related_lookup = {}
+    for shard_file in shard_files:
+        metadata = {}
+        related_lookup.update(build_related_lookup(iter_cases(shard_file, metadata), related_index))
+        shard = metadata.get('shard')
+        if not shard:
+            raise ValueError(f"{shard_file} is not a shard output")
+
+        if shard_count is None:
+            shard_count = shard['count']
+        elif shard['count'] != shard_count:
+            raise ValueError(f"{shard_file} belongs to a {shard['count']}-way split, expected {shard_count}")
+
+        if shard['index'] in seen_shards:
+            raise ValueError(f"Shard {shard['index']}/{shard_count} given more than once")
+        seen_shards.add(shard['index'])
+
+    missing = sorted(set(range(shard_count or 0)) - seen_shards)
+    if missing:
+        print(f"Warning: missing shards {missing}, output will be partial")
+
+    # Diff against what was published last time to get the changeset
+    published_state = tag_state_path(output_file)
+    changeset = diff_cases(iter_state_section(published_state, 'cases'), iter_merged_section(state_files, 'cases'))
+
+    # A single-node run processes files in sorted filename order
+    writer = OutputWriter(output_file)
+    try:
+        for case in heapq.merge(*(iter_sorted_cases(f) for f in shard_files), key=lambda case: case['filename']):
+            case['related_cases'] = get_related_cases(case['content_hash'], related_index, related_lookup)
+            writer.write_case(case)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close({'tag_stats': build_tag_stats(cases_per_tag)})
+
+    write_state(published_state, dedupe, cases_per_tag, iter_merged_section(state_files, 'hash_refs'),
+                iter_merged_section(state_files, 'cases'))
+    merge_term_indexes([get_index_dir(f) for f in shard_files if os.path.exists(get_index_dir(f))],
+                       get_index_dir(output_file))
+    merge_snippet_stores([get_snippets_dir(f) for f in shard_files], get_snippets_dir(output_file))
+    save_changeset(changeset, changeset_path(output_file))
+    print(f"Merged {len(shard_files)} shards with {writer.count} cases into {output_file}")
+    print(f"Changes since last merge: {len(changeset['added'])} added, "
+          f"{len(changeset['modified'])} modified, {len(changeset['removed'])} removed")
+    return writer.count, build_tag_stats(cases_per_tag)
@@ -0,0 +1,190 @@
+import os
+import re
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Snippets kept per significant tag, each from a different page
+SNIPPETS_PER_TAG = 3
+# Characters of context on either side of a keyword hit
+CONTEXT_CHARS = 60
+# Documents are spread over files by the first characters of their content hash,
+# so the frontend only loads the file a case is in
+BUCKET_CHARS = 2
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def analyze_pages(pages: List[Tuple[int, str]], keywords: List[str]) -> Tuple[Dict[str, List[List[int]]], Dict[str, List[Dict]]]:
+    """Keyword hits per page and the first few snippets for every keyword.
+
+    Returns {keyword: [[page, count], ...]} in page order, and
+    {keyword: [snippet, ...]} with at most SNIPPETS_PER_TAG snippets from
+    the first pages the keyword is on. Counting per page costs the same as
+    counting over the whole text; a snippet only needs one find() on a page
+    that is already known to have a hit.
+    """
+    page_counts: Dict[str, List[List[int]]] = {}
+    snippets: Dict[str, List[Dict]] = {}
+    for page, text in pages:
+        text_lower = text.lower()
+        for keyword in keywords:
+            count = text_lower.count(keyword)
+            if count == 0:
+                continue
+            page_counts.setdefault(keyword, []).append([page, count])
+            keyword_snippets = snippets.setdefault(keyword, [])
+            if len(keyword_snippets) < SNIPPETS_PER_TAG:
+                keyword_snippets.append(make_snippet(page, text, text_lower, text_lower.find(keyword), len(keyword)))
+    return page_counts, snippets
+
+def make_snippet(page: int, text: str, text_lower: str, position: int, length: int) -> Dict:
+    """The keyword at position with some words around it, whitespace collapsed.
+
+    The keyword is at snippet['text'][start:start + length].
+    """
+    # Lowercasing can change the length of a few characters, positions then only hold in text_lower
+    if len(text_lower) != len(text):
+        text = text_lower
+    before = WHITESPACE_PATTERN.sub(' ', text[max(0, position - CONTEXT_CHARS):position])
+    after = WHITESPACE_PATTERN.sub(' ', text[position + length:position + length + CONTEXT_CHARS])
+    # Drop the words the window cuts in half
+    prefix = suffix = ''
+    if position > CONTEXT_CHARS:
+        before = before[before.find(' ') + 1:]
+        prefix = '…'
+    if position + length + CONTEXT_CHARS < len(text):
+        after = after[:after.rfind(' ')] if ' ' in after else after
+        suffix = '…'
+    before = prefix + before.lstrip()
+    return {
+        'page': page,
+        'text': before + text[position:position + length] + after.rstrip() + suffix,
+        'start': len(before)
+    }
+
+def merge_page_hits(chunks: List[Tuple[Dict[str, List[List[int]]], Dict[str, List[Dict]]]]) -> Tuple[Dict[str, List[List[int]]], Dict[str, List[Dict]]]:
+    """Combine analyze_pages results of consecutive page ranges, in page order"""
+    page_counts: Dict[str, List[List[int]]] = {}
+    snippets: Dict[str, List[Dict]] = {}
+    for chunk_counts, chunk_snippets in chunks:
+        for keyword, counts in chunk_counts.items():
+            page_counts.setdefault(keyword, []).extend(counts)
+        for keyword, keyword_snippets in chunk_snippets.items():
+            merged = snippets.setdefault(keyword, [])
+            merged.extend(keyword_snippets[:SNIPPETS_PER_TAG - len(merged)])
+    return page_counts, snippets
+
+def build_evidence(significant_tags: List[str], page_counts: Dict[str, List[List[int]]],
+                   snippets: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """Pages and snippets for each significant tag, the record stored per document.
+
+    pages and counts are parallel lists: the tag is on pages[i] counts[i] times.
+    """
+    evidence = {}
+    for tag in significant_tags:
+        hits = page_counts.get(tag, [])
+        evidence[tag] = {
+            'pages': [page for page, count in hits],
+            'counts': [count for page, count in hits],
+            'snippets': snippets.get(tag, [])
+        }
+    return evidence
+
+def get_snippets_dir(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + '.snippets'
+
+def get_bucket(content_hash: str) -> str:
+    return content_hash[:BUCKET_CHARS]
+
+class SnippetStore:
+    """Evidence for every document, keyed by content hash and split into bucket files.
+
+    index.json lists the documents that have been through the snippet pass,
+    including those without any significant tag. Bucket files are only read
+    and rewritten when a document in them is added or removed, so an
+    incremental run does not load the evidence of the whole corpus.
+    """
+
+    def __init__(self, store_dir: str, docs: Optional[Iterable[str]] = None):
+        self.store_dir = store_dir
+        self.docs = set(docs or [])
+
+    def __contains__(self, doc: str) -> bool:
+        return doc in self.docs
+
+    @classmethod
+    def load(cls, store_dir: str) -> 'SnippetStore':
+        index_file = os.path.join(store_dir, 'index.json')
+        if not os.path.exists(index_file):
+            return cls(store_dir)
+        with open(index_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Snippets made with other settings are redone
+        if meta['params'] != [SNIPPETS_PER_TAG, CONTEXT_CHARS, BUCKET_CHARS]:
+            print("Snippet settings changed, rebuilding snippets")
+            return cls(store_dir)
+        return cls(store_dir, meta['docs'])
+
+    def bucket_path(self, bucket: str) -> str:
+        return os.path.join(self.store_dir, f"{bucket}.json")
+
+    def read_bucket(self, bucket: str) -> Dict[str, Dict]:
+        path = self.bucket_path(bucket)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_bucket(self, bucket: str, entries: Dict[str, Dict]):
+        path = self.bucket_path(bucket)
+        # Documents without significant tags are only listed in index.json
+        entries = {doc: entries[doc] for doc in sorted(entries) if entries[doc]}
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, separators=(',', ':'))
+
+    def update(self, new_evidence: Dict[str, Dict], keep_docs: Iterable[str]) -> bool:
+        """Add new documents and drop those outside keep_docs, returning whether anything changed"""
+        keep_docs = set(keep_docs)
+        removed = {doc for doc in self.docs if doc not in keep_docs}
+        if not removed and not new_evidence:
+            return False
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        changes: Dict[str, List[str]] = {}
+        for doc in removed | set(new_evidence):
+            changes.setdefault(get_bucket(doc), []).append(doc)
+        for bucket, docs in sorted(changes.items()):
+            entries = self.read_bucket(bucket)
+            for doc in docs:
+                if doc in removed:
+                    entries.pop(doc, None)
+                else:
+                    entries[doc] = new_evidence[doc]
+            self.write_bucket(bucket, entries)
+
+        self.docs = (self.docs - removed) | set(new_evidence)
+        self.save_index()
+        return True
+
+    def save_index(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({'params': [SNIPPETS_PER_TAG, CONTEXT_CHARS, BUCKET_CHARS], 'docs': sorted(self.docs)}, f)
+
+def merge_snippet_stores(store_dirs: List[str], output_dir: str):
+    """Combine the stores of shards that never share a document, one bucket at a time"""
+    stores = [SnippetStore.load(store_dir) for store_dir in store_dirs]
+    merged = SnippetStore(output_dir, set().union(*(store.docs for store in stores)))
+    os.makedirs(output_dir, exist_ok=True)
+    # Buckets of an earlier merge that are no longer used are removed by write_bucket
+    buckets = {name[:-len('.json')] for name in os.listdir(output_dir) if name.endswith('.json') and name != 'index.json'}
+    buckets |= {get_bucket(doc) for doc in merged.docs}
+    for bucket in sorted(buckets):
+        entries = {}
+        for store in stores:
+            entries.update(store.read_bucket(bucket))
+        merged.write_bucket(bucket, entries)
+    merged.save_index()
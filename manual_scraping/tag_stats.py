@@ -0,0 +1,229 @@
+import os
+import json
+import heapq
+from collections import Counter
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from court_cases import build_tag_stats
+from case_stream import JsonStream
+
+class TagStats:
+    """Persisted cases_per_tag counters that are updated with per-case deltas.
+
+    Every case is remembered by key together with the significant tags it
+    contributed, so a changed or removed case can be subtracted again without
+    looking at the rest of the corpus. Two instances built from disjoint sets
+    of cases can be merged by adding them together.
+    """
+
+    def __init__(self, dedupe: bool = False):
+        self.dedupe = dedupe
+        self.cases: Dict[str, Dict] = {}
+        self.cases_per_tag = Counter()
+        # Number of cases per content hash, used to count duplicates once
+        self.hash_refs = Counter()
+
+    def _count(self, entry: Dict, delta: int):
+        content_hash = entry.get('content_hash')
+        if content_hash:
+            before = self.hash_refs[content_hash]
+            self.hash_refs[content_hash] += delta
+            if self.hash_refs[content_hash] <= 0:
+                del self.hash_refs[content_hash]
+            # With dedupe only the first copy in and the last copy out move the counters
+            if self.dedupe and not ((before == 0 and delta > 0) or (before == 1 and delta < 0)):
+                return
+
+        for tag in entry['tags']:
+            self.cases_per_tag[tag] += delta
+            if self.cases_per_tag[tag] <= 0:
+                del self.cases_per_tag[tag]
+
+    def set_case(self, key: str, significant_tags: List[str], fingerprint: str,
+                 content_hash: Optional[str] = None) -> Optional[str]:
+        """Add or replace a case, returning 'added', 'modified' or None if unchanged"""
+        previous = self.cases.get(key)
+        if previous and previous['fingerprint'] == fingerprint:
+            return None
+
+        if previous:
+            self._count(previous, -1)
+        entry = {'tags': list(significant_tags), 'fingerprint': fingerprint, 'content_hash': content_hash}
+        self.cases[key] = entry
+        self._count(entry, 1)
+        return 'modified' if previous else 'added'
+
+    def remove_case(self, key: str) -> bool:
+        entry = self.cases.pop(key, None)
+        if entry is None:
+            return False
+        self._count(entry, -1)
+        return True
+
+    def sync(self, current: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """Bring the counters in line with current and return what changed.
+
+        current maps case keys to dicts with 'tags', 'fingerprint' and
+        optionally 'content_hash'. Only cases whose fingerprint differs from
+        the stored one touch the counters.
+        """
+        return self.update(current, set(self.cases) | set(current))
+
+    def update(self, current: Dict[str, Dict], keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Like sync, but only for keys: those in current are set, the others removed"""
+        changeset = {'added': [], 'removed': [], 'modified': []}
+        keys = sorted(keys)
+
+        for key in keys:
+            if key not in current and self.remove_case(key):
+                changeset['removed'].append(key)
+
+        for key in keys:
+            if key not in current:
+                continue
+            entry = current[key]
+            change = self.set_case(key, entry['tags'], entry['fingerprint'], entry.get('content_hash'))
+            if change:
+                changeset[change].append(key)
+
+        return changeset
+
+    def with_dedupe(self, dedupe: bool) -> 'TagStats':
+        """Recount the stored cases under a different dedupe setting"""
+        rebuilt = TagStats(dedupe)
+        for key, entry in self.cases.items():
+            rebuilt.set_case(key, entry['tags'], entry['fingerprint'], entry.get('content_hash'))
+        return rebuilt
+
+    def tag_stats(self) -> Dict:
+        return build_tag_stats(self.cases_per_tag)
+
+    def to_dict(self) -> Dict:
+        return {
+            'dedupe': self.dedupe,
+            'cases_per_tag': dict(sorted(self.cases_per_tag.items())),
+            'hash_refs': dict(sorted(self.hash_refs.items())),
+            'cases': {key: self.cases[key] for key in sorted(self.cases)}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TagStats':
+        stats = cls(data.get('dedupe', False))
+        stats.cases = data.get('cases', {})
+        stats.cases_per_tag = Counter(data.get('cases_per_tag', {}))
+        stats.hash_refs = Counter(data.get('hash_refs', {}))
+        return stats
+
+    def save(self, state_file: str):
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, state_file: str, dedupe: Optional[bool] = None) -> 'TagStats':
+        """Load persisted stats, starting empty if there are none yet.
+
+        If dedupe is given and differs from the stored setting, the stored
+        cases are recounted under the new setting.
+        """
+        if not os.path.exists(state_file):
+            return cls(bool(dedupe))
+        with open(state_file, 'r', encoding='utf-8') as f:
+            stats = cls.from_dict(json.load(f))
+        if dedupe is not None and stats.dedupe != dedupe:
+            stats = stats.with_dedupe(dedupe)
+        return stats
+
+def read_state_header(state_file: str) -> Dict:
+    """dedupe and cases_per_tag of a saved state, without keeping its cases"""
+    header = {'dedupe': False, 'cases_per_tag': {}}
+    with open(state_file, 'r', encoding='utf-8') as f:
+        stream = JsonStream(f)
+        for key in stream.object():
+            if key in header:
+                header[key] = stream.value()
+            else:
+                stream.skip()
+    return header
+
+def iter_state_section(state_file: str, section: str) -> Iterator[Tuple[str, object]]:
+    """Entries of the cases or hash_refs of a saved state one at a time, in key order"""
+    if not os.path.exists(state_file):
+        return
+    with open(state_file, 'r', encoding='utf-8') as f:
+        stream = JsonStream(f)
+        for key in stream.object():
+            if key != section:
+                stream.skip()
+                continue
+            for item_key in stream.object():
+                yield item_key, stream.value()
+            return
+
+def iter_merged_section(state_files: List[str], section: str) -> Iterator[Tuple[str, object]]:
+    """Entries of a section over the states of shards that never share a case, in key order"""
+    merged = heapq.merge(*(iter_state_section(f, section) for f in state_files), key=lambda item: item[0])
+    for key, items in groupby(merged, key=lambda item: item[0]):
+        values = [value for _, value in items]
+        if section == 'hash_refs':
+            yield key, sum(values)
+        elif len(values) > 1:
+            raise ValueError(f"Cannot merge tag stats that share case {key}")
+        else:
+            yield key, values[0]
+
+def diff_cases(old_cases: Iterable[Tuple[str, Dict]], new_cases: Iterable[Tuple[str, Dict]]) -> Dict[str, List[str]]:
+    """Changeset between two streams of case entries in key order, like TagStats.sync"""
+    changeset = {'added': [], 'removed': [], 'modified': []}
+    sides = heapq.merge(((key, 0, entry) for key, entry in old_cases),
+                        ((key, 1, entry) for key, entry in new_cases), key=lambda item: item[:2])
+    for key, items in groupby(sides, key=lambda item: item[0]):
+        entries = {side: entry for _, side, entry in items}
+        if 1 not in entries:
+            changeset['removed'].append(key)
+        elif 0 not in entries:
+            changeset['added'].append(key)
+        elif entries[0]['fingerprint'] != entries[1]['fingerprint']:
+            changeset['modified'].append(key)
+    return changeset
+
+def write_state(state_file: str, dedupe: bool, cases_per_tag: Dict[str, int],
+                hash_refs: Iterable[Tuple[str, int]], cases: Iterable[Tuple[str, Dict]]):
+    """Write the same text as TagStats.save from entries given in key order"""
+    temp_file = state_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(f'{{"dedupe": {json.dumps(dedupe)}, "cases_per_tag": '
+                f'{json.dumps(dict(sorted(cases_per_tag.items())), ensure_ascii=False)}')
+        for section, items in (('hash_refs', hash_refs), ('cases', cases)):
+            f.write(f', "{section}": {{')
+            for i, (key, value) in enumerate(items):
+                f.write(f'{", " if i else ""}{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}')
+            f.write('}')
+        f.write('}')
+    os.replace(temp_file, state_file)
+
+def tag_state_path(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + '.tag_state.json'
+
+def changeset_path(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + '.changeset.json'
+
+def is_sidecar_path(path: str) -> bool:
+    return path.endswith(('.tag_state.json', '.changeset.json'))
+
+def case_fingerprint(case: Dict, significant_tags: List[str]) -> str:
+    """Cheap identity of a published case.
+
+    Everything else in a case is derived from the document content, so the
+    content hash plus the fields that depend on other files is enough.
+    """
+    return '|'.join([
+        case.get('content_hash') or '',
+        case.get('verdict_pdf') or '',
+        ','.join(case['court_ids']),
+        ','.join(significant_tags)
+    ])
+
+def save_changeset(changeset: Dict[str, List[str]], output_file: str):
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, ensure_ascii=False, indent=2)
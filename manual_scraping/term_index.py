@@ -0,0 +1,344 @@
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import argparse
+from array import array
+from collections import Counter
+from bisect import bisect_left
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from case_stream import iter_cases
+
+# Letters only, so that a keyword can never match across a token boundary
+TOKEN_PATTERN = re.compile(r'[^\W\d_]+')
+
+MATCH_MODES = ('substring', 'prefix', 'exact')
+
+# Share of removed documents at which an update drops their postings
+COMPACT_RATIO = 0.2
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase Swedish word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class TermIndex:
+    """Sparse term frequencies for every processed document.
+
+    The matrix is stored in CSR form with one row per term, so row t lists
+    the documents containing term t and how often. A keyword query only has
+    to read the rows of the terms that match it. Documents are identified by
+    the content hash of their PDF.
+
+    Incremental updates append new documents at the end and leave removed
+    ones in place as None, so an update only copies the arrays instead of
+    rebuilding them. The removed postings are dropped once they make up
+    COMPACT_RATIO of the documents.
+    """
+
+    def __init__(self, docs: List[Optional[str]], vocab: List[str], indptr: array, indices: array, counts: array):
+        self.docs = docs
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+
+    @classmethod
+    def build(cls, doc_vectors: Dict[str, Dict[str, int]]) -> 'TermIndex':
+        docs = sorted(doc_vectors)
+        postings: Dict[str, List] = {}
+        for doc_id, doc in enumerate(docs):
+            for term, count in doc_vectors[doc].items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+        vocab = sorted(postings)
+        indptr = array('Q', [0])
+        indices = array('I')
+        counts = array('I')
+        for term in vocab:
+            for doc_id, count in postings[term]:
+                indices.append(doc_id)
+                counts.append(count)
+            indptr.append(len(indices))
+        return cls(docs, vocab, indptr, indices, counts)
+
+    def live_docs(self) -> Set[str]:
+        return {doc for doc in self.docs if doc is not None}
+
+    def doc_vectors(self) -> Dict[str, Dict[str, int]]:
+        """Per-document term counts, the inverse of build()"""
+        vectors: Dict[str, Dict[str, int]] = {doc: {} for doc in self.live_docs()}
+        for term_id, term in enumerate(self.vocab):
+            for i in range(self.indptr[term_id], self.indptr[term_id + 1]):
+                doc = self.docs[self.indices[i]]
+                if doc is not None:
+                    vectors[doc][term] = self.counts[i]
+        return vectors
+
+    def updated(self, new_vectors: Dict[str, Dict[str, int]], keep_docs: Iterable[str]) -> 'TermIndex':
+        """Return an index with new_vectors added and every document outside keep_docs dropped.
+
+        New documents get ids after every existing one, so each row only
+        gains entries at its end and the rows without new terms are copied
+        over as whole slices. Costs O(new postings + terms) plus a copy of
+        the arrays, rather than a rebuild of the whole corpus.
+        """
+        keep_docs = set(keep_docs)
+        # Documents that are parsed again are removed and added back
+        docs = [doc if doc is not None and doc in keep_docs and doc not in new_vectors else None for doc in self.docs]
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc in sorted(new_vectors):
+            doc_id = len(docs)
+            docs.append(doc)
+            for term, count in new_vectors[doc].items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+        vocab: List[str] = []
+        indptr = array('Q', [0])
+        indices = array('I')
+        counts = array('I')
+        # Next row of this index that has not been copied yet
+        copied = 0
+
+        def copy_rows(end: int):
+            start_value, end_value = self.indptr[copied], self.indptr[end]
+            shift = len(indices) - start_value
+            indices.extend(self.indices[start_value:end_value])
+            counts.extend(self.counts[start_value:end_value])
+            indptr.extend(value + shift for value in self.indptr[copied + 1:end + 1])
+            vocab.extend(self.vocab[copied:end])
+
+        for term in sorted(postings):
+            position = bisect_left(self.vocab, term, copied)
+            exists = position < len(self.vocab) and self.vocab[position] == term
+            copy_rows(position + 1 if exists else position)
+            copied = position + 1 if exists else position
+            if not exists:
+                vocab.append(term)
+                indptr.append(len(indices))
+            for doc_id, count in postings[term]:
+                indices.append(doc_id)
+                counts.append(count)
+            indptr[-1] = len(indices)
+        copy_rows(len(self.vocab))
+
+        index = TermIndex(docs, vocab, indptr, indices, counts)
+        if docs.count(None) > COMPACT_RATIO * len(docs):
+            index = index.compacted()
+        return index
+
+    def compacted(self) -> 'TermIndex':
+        """Drop the postings of removed documents and the terms left without any"""
+        remap = array('i', [-1]) * len(self.docs)
+        docs = []
+        for doc_id, doc in enumerate(self.docs):
+            if doc is not None:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+
+        vocab = []
+        indptr = array('Q', [0])
+        indices = array('I')
+        counts = array('I')
+        for term_id, term in enumerate(self.vocab):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            for doc_id, count in zip(self.indices[start:end], self.counts[start:end]):
+                if remap[doc_id] >= 0:
+                    indices.append(remap[doc_id])
+                    counts.append(count)
+            if len(indices) > indptr[-1]:
+                vocab.append(term)
+                indptr.append(len(indices))
+        return TermIndex(docs, vocab, indptr, indices, counts)
+
+    def match_terms(self, keyword: str, match: str = 'substring') -> Dict[int, int]:
+        """Map the ids of terms matching keyword to how many times each contains it"""
+        keyword = keyword.lower()
+        if match == 'exact':
+            return {term_id: 1 for term_id, term in enumerate(self.vocab) if term == keyword}
+        if match == 'prefix':
+            return {term_id: 1 for term_id, term in enumerate(self.vocab) if term.startswith(keyword)}
+        # Same semantics as str.count on the full text, which analyze_text_content uses
+        return {term_id: term.count(keyword) for term_id, term in enumerate(self.vocab) if keyword in term}
+
+    def keyword_counts(self, keywords: List[str], match: str = 'substring') -> Dict[str, Dict[str, int]]:
+        """Count keywords per document, in the same shape as a case's keyword_counts"""
+        results: Dict[str, Dict[str, int]] = {}
+        for keyword in keywords:
+            per_doc = Counter()
+            for term_id, weight in self.match_terms(keyword, match).items():
+                for i in range(self.indptr[term_id], self.indptr[term_id + 1]):
+                    per_doc[self.indices[i]] += self.counts[i] * weight
+            for doc_id, count in per_doc.items():
+                doc = self.docs[doc_id]
+                if doc is not None:
+                    results.setdefault(doc, {})[keyword] = count
+        return results
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        with open(os.path.join(index_dir, 'vocab.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.vocab))
+        for name, values in (('indptr', self.indptr), ('indices', self.indices), ('counts', self.counts)):
+            with open(os.path.join(index_dir, f'{name}.bin'), 'wb') as f:
+                values.tofile(f)
+        with open(os.path.join(index_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'byteorder': sys.byteorder,
+                'num_terms': len(self.vocab),
+                'num_values': len(self.indices),
+                'docs': self.docs
+            }, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'TermIndex':
+        with open(os.path.join(index_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(index_dir, 'vocab.txt'), 'r', encoding='utf-8') as f:
+            vocab = f.read().split('\n') if meta['num_terms'] else []
+
+        arrays = {}
+        for name, typecode, length in (('indptr', 'Q', meta['num_terms'] + 1),
+                                       ('indices', 'I', meta['num_values']),
+                                       ('counts', 'I', meta['num_values'])):
+            values = array(typecode)
+            with open(os.path.join(index_dir, f'{name}.bin'), 'rb') as f:
+                values.fromfile(f, length)
+            if meta['byteorder'] != sys.byteorder:
+                values.byteswap()
+            arrays[name] = values
+        return cls(meta['docs'], vocab, arrays['indptr'], arrays['indices'], arrays['counts'])
+
+    @classmethod
+    def load_or_empty(cls, index_dir: str) -> 'TermIndex':
+        if not os.path.exists(os.path.join(index_dir, 'index.json')):
+            return cls.build({})
+        return cls.load(index_dir)
+
+def read_values(f, typecode: str, length: int, byteswap: bool) -> array:
+    values = array(typecode)
+    values.fromfile(f, length)
+    if byteswap:
+        values.byteswap()
+    return values
+
+def iter_rows(index_dir: str, meta: Dict, remap: array) -> Iterator[Tuple[str, array, array]]:
+    """Rows of a saved index in vocab order, read one at a time.
+
+    Document ids are translated with remap, and the postings of documents
+    mapped to -1 are left out.
+    """
+    byteswap = meta['byteorder'] != sys.byteorder
+    has_removed = -1 in remap
+    with open(os.path.join(index_dir, 'vocab.txt'), 'r', encoding='utf-8') as vocab_file, \
+            open(os.path.join(index_dir, 'indptr.bin'), 'rb') as indptr_file, \
+            open(os.path.join(index_dir, 'indices.bin'), 'rb') as indices_file, \
+            open(os.path.join(index_dir, 'counts.bin'), 'rb') as counts_file:
+        start = read_values(indptr_file, 'Q', 1, byteswap)[0]
+        for _ in range(meta['num_terms']):
+            term = vocab_file.readline().rstrip('\n')
+            end = read_values(indptr_file, 'Q', 1, byteswap)[0]
+            indices = read_values(indices_file, 'I', end - start, byteswap)
+            counts = read_values(counts_file, 'I', end - start, byteswap)
+            start = end
+            if not has_removed:
+                yield term, array('I', [remap[doc_id] for doc_id in indices]), counts
+                continue
+            kept = [i for i, doc_id in enumerate(indices) if remap[doc_id] >= 0]
+            yield term, array('I', [remap[indices[i]] for i in kept]), array('I', [counts[i] for i in kept])
+
+def merge_term_indexes(index_dirs: List[str], output_dir: str) -> int:
+    """Combine the saved indexes of shards that never share a document, returning the number of documents.
+
+    The rows of all shards are merged in vocab order and written as they are
+    read, so besides the document list only one row per shard is in memory.
+    The documents of each shard get the ids after those of the shards
+    before it, which keeps every row in ascending id order, and removed
+    documents are dropped on the way.
+    """
+    docs: List[str] = []
+    shards = []
+    for index_dir in index_dirs:
+        with open(os.path.join(index_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        remap = array('i', [-1]) * len(meta['docs'])
+        for doc_id, doc in enumerate(meta['docs']):
+            if doc is not None:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+        shards.append((index_dir, {'byteorder': meta['byteorder'], 'num_terms': meta['num_terms']}, remap))
+
+    os.makedirs(output_dir, exist_ok=True)
+    num_terms = 0
+    num_values = 0
+    with open(os.path.join(output_dir, 'vocab.txt'), 'w', encoding='utf-8') as vocab_file, \
+            open(os.path.join(output_dir, 'indptr.bin'), 'wb') as indptr_file, \
+            open(os.path.join(output_dir, 'indices.bin'), 'wb') as indices_file, \
+            open(os.path.join(output_dir, 'counts.bin'), 'wb') as counts_file:
+        array('Q', [0]).tofile(indptr_file)
+        # heapq.merge keeps rows with the same term in shard order
+        rows = heapq.merge(*(iter_rows(*shard) for shard in shards), key=lambda row: row[0])
+        for term, term_rows in groupby(rows, key=lambda row: row[0]):
+            start = num_values
+            for _, indices, counts in term_rows:
+                indices.tofile(indices_file)
+                counts.tofile(counts_file)
+                num_values += len(indices)
+            # A term only used by removed documents is left out, as in compacted()
+            if num_values == start:
+                continue
+            vocab_file.write(('\n' if num_terms else '') + term)
+            array('Q', [num_values]).tofile(indptr_file)
+            num_terms += 1
+
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'byteorder': sys.byteorder,
+            'num_terms': num_terms,
+            'num_values': num_values,
+            'docs': docs
+        }, f)
+    return len(docs)
+
+def get_index_dir(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + '.terms'
+
+def count_keywords_by_case(keywords: List[str], cases_file: str, match: str = 'substring') -> Dict[str, Dict[str, int]]:
+    """Keyword counts for every case in cases_file, keyed by PDF filename"""
+    index = TermIndex.load(get_index_dir(cases_file))
+    by_doc = index.keyword_counts(keywords, match)
+    results = {}
+    for case in iter_cases(cases_file):
+        counts = by_doc.get(case.get('content_hash'))
+        if counts:
+            results[case['filename']] = counts
+    return results
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Count ad-hoc keywords across all processed verdicts")
+    parser.add_argument('keywords', nargs='+', help="Keywords to count")
+    parser.add_argument('--match', choices=MATCH_MODES, default='substring',
+                        help="substring matches like KEYWORDS (default), prefix and exact match whole tokens")
+    parser.add_argument('--cases', default=os.path.join(script_dir, 'court_cases.json'),
+                        help="Processed output whose term index to query")
+    parser.add_argument('--summary', action='store_true', help="Only print totals per keyword")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    results = count_keywords_by_case(args.keywords, args.cases, args.match)
+    elapsed = time.perf_counter() - start_time
+
+    if args.summary:
+        for keyword in args.keywords:
+            matching = [counts[keyword] for counts in results.values() if keyword in counts]
+            print(f"{keyword}: {sum(matching)} mentions in {len(matching)} cases")
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"Query took {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# Suffixes browsers and download tools use while a file is still being written
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.partial', '.download', '.tmp')
+# Seconds a file must keep the same size and mtime before it is processed
+STABLE_SECONDS = 2.0
+# Seconds to wait for a stable file without a PDF trailer before processing it anyway
+TRAILER_TIMEOUT = 60.0
+POLL_INTERVAL = 1.0
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+def is_watched_file(name: str) -> bool:
+    """Whether name is a finished PDF rather than a partial download or a temp file"""
+    lower = name.lower()
+    if lower.startswith(('.', '~$')) or lower.endswith(PARTIAL_SUFFIXES):
+        return False
+    return lower.endswith('.pdf')
+
+def has_pdf_trailer(path: str) -> bool:
+    # A complete PDF ends with %%EOF, possibly followed by a line break
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        return b'%%EOF' in f.read()
+
+class InotifyWatcher:
+    """Names of files changed in a directory, from Linux inotify"""
+
+    name = 'inotify'
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Block until something changes or timeout seconds pass"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if name:
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Names of files changed in a directory, by comparing listings"""
+
+    name = 'polling'
+
+    def __init__(self, directory: str, interval: float = POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        changed = {name for name in current.keys() | self.snapshot.keys()
+                   if current.get(name) != self.snapshot.get(name)}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+def create_watcher(directory: str, use_polling: bool = False):
+    if not use_polling:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError):
+            # Not on Linux, or out of inotify watches
+            pass
+    return PollingWatcher(directory)
+
+class StabilityTracker:
+    """Holds changed files back until they have stopped changing.
+
+    A file is ready once its size and mtime stayed the same for
+    stable_seconds and it ends with a PDF trailer, so files that are still
+    being written are never parsed.
+    """
+
+    def __init__(self, directory: str, stable_seconds: float = STABLE_SECONDS):
+        self.directory = directory
+        self.stable_seconds = stable_seconds
+        # Filename -> (size, mtime_ns) when last seen, and since when it has been unchanged
+        self.pending: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+
+    def touch(self, names: Iterable[str]):
+        now = time.monotonic()
+        for name in names:
+            self.pending[name] = (None, now)
+
+    def pop_ready(self) -> Tuple[Set[str], Set[str]]:
+        """Files that are ready to process, and files that were removed"""
+        ready, removed = set(), set()
+        now = time.monotonic()
+        for name, (signature, since) in list(self.pending.items()):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                current = (stat.st_size, stat.st_mtime_ns)
+                if current != signature:
+                    self.pending[name] = (current, now)
+                    continue
+                if now - since < self.stable_seconds or stat.st_size == 0:
+                    continue
+                if not has_pdf_trailer(path) and now - since < TRAILER_TIMEOUT:
+                    continue
+            except FileNotFoundError:
+                removed.add(name)
+                del self.pending[name]
+                continue
+            ready.add(name)
+            del self.pending[name]
+        return ready, removed
+
+    def unstable(self) -> Set[str]:
+        return set(self.pending)
@@ -1,11 +1,13 @@
+import os
 import json
-import requests
 import io
 import PyPDF2
 import re
 from typing import Optional, Dict, List, Tuple, Set
 from collections import Counter
 
+from extract_verdict_links import fetch
+
 # Keywords to look for in the verdicts
 KEYWORDS = [
     "bedrägeri",
@@ -114,8 +116,8 @@ def get_significant_tags(tags: List[str], keyword_counts: Dict[str, int]) -> Lis
 
 def download_and_process_pdf(url: str) -> Tuple[List[str], Dict[str, int], Optional[str], Optional[str], List[str], int]:
     try:
-        # Download PDF
-        response = requests.get(url)
+        # Download PDF, retrying rate limits and server errors
+        response = fetch(url)
         if response.status_code != 200:
             print(f"Failed to download PDF from {url}")
             return [], {}, None, None, [], 0
@@ -153,6 +155,23 @@ def download_and_process_pdf(url: str) -> Tuple[List[str], Dict[str, int], Optio
         print(f"Error processing PDF {url}: {str(e)}")
         return [], {}, None, None, [], 0
 
+def load_previous_output(output_file: str) -> Tuple[Dict[str, Dict], Counter]:
+    # Cases from the last run keyed by URL, together with their tag counts
+    if not os.path.exists(output_file):
+        return {}, Counter()
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            previous_data = json.load(f)
+    except json.JSONDecodeError:
+        print(f"Warning: {output_file} is not a valid JSON file, processing everything again")
+        return {}, Counter()
+    previous_cases = {case['verdict_pdf']: case for case in previous_data.get('cases', [])}
+    cases_per_tag = Counter(previous_data.get('tag_stats', {}).get('cases_per_tag', {}))
+    return previous_cases, cases_per_tag
+
+def get_case_significant_tags(case: Dict) -> List[str]:
+    return get_significant_tags(case['tags'], case['keyword_counts'])
+
 def process_verdicts(input_file='verdict_links.json', output_file='court_cases.json'):
     # Load verdict links
     try:
@@ -165,14 +184,29 @@ def process_verdicts(input_file='verdict_links.json', output_file='court_cases.j
         print(f"Error: {input_file} is not a valid JSON file.")
         return
 
+    # Start from the previous run so that only new verdicts are downloaded
+    # and the tag counts are updated with deltas instead of recomputed
+    previous_cases, cases_per_tag = load_previous_output(output_file)
+    changeset = {'added': [], 'removed': [], 'modified': []}
+
+    # Verdicts that are no longer linked drop out of the counts
+    current_urls = set(verdict_links)
+    for url, case in previous_cases.items():
+        if url not in current_urls:
+            cases_per_tag.subtract(get_case_significant_tags(case))
+            changeset['removed'].append(url)
+
     # Process each verdict
     processed_cases = []
     total_cases = len(verdict_links)
     
-    # Keep track of cases per tag
-    cases_per_tag: Dict[str, int] = Counter()
-    
     for i, url in enumerate(verdict_links, 1):
+        previous_case = previous_cases.get(url)
+        # Reuse earlier results, but retry verdicts that failed to download
+        if previous_case and previous_case['num_pages'] > 0:
+            processed_cases.append(previous_case)
+            continue
+
         print(f"Processing verdict {i}/{total_cases}")
         
         # Process PDF and get tags and counts
@@ -181,6 +215,14 @@ def process_verdicts(input_file='verdict_links.json', output_file='court_cases.j
         # Get significant tags for this case
         significant_tags = get_significant_tags(tags, keyword_counts)
         
+        # Replace the contribution of the failed attempt with the new one
+        if previous_case:
+            cases_per_tag.subtract(get_case_significant_tags(previous_case))
+            if num_pages > 0:
+                changeset['modified'].append(url)
+        else:
+            changeset['added'].append(url)
+
         # Update cases per tag count (increment by 1 for each significant tag in this case)
         cases_per_tag.update({tag: 1 for tag in significant_tags})
         
@@ -205,6 +247,9 @@ def process_verdicts(input_file='verdict_links.json', output_file='court_cases.j
         print(f"Significant tags: {significant_tags}")
         print("-" * 80)
 
+    # Drop tags that no longer occur in any case
+    cases_per_tag = Counter({tag: count for tag, count in cases_per_tag.items() if count > 0})
+
     # Create the final output with both cases and tag statistics
     output_data = {
         'cases': processed_cases,
@@ -217,8 +262,15 @@ def process_verdicts(input_file='verdict_links.json', output_file='court_cases.j
     # Save everything to a single JSON file
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+    # Save what changed since the previous run next to the output
+    changeset_file = os.path.splitext(output_file)[0] + '.changeset.json'
+    with open(changeset_file, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, ensure_ascii=False, indent=2)
     
     print(f"\nSuccessfully processed {len(processed_cases)} verdicts and saved to {output_file}")
+    print(f"Changes since last run: {len(changeset['added'])} added, "
+          f"{len(changeset['modified'])} modified, {len(changeset['removed'])} removed")
     print("\nNumber of cases per significant tag:")
     for tag, count in sorted(cases_per_tag.items(), key=lambda x: (-x[1], x[0])):
         print(f"{tag}: {count} cases")
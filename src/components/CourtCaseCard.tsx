@@ -1,5 +1,6 @@
+import { useState } from 'react';
 import { DocumentTextIcon, CalendarIcon } from '@heroicons/react/24/outline';
-import { CourtCase } from '@/types/CourtCase';
+import { CourtCase, TagEvidence } from '@/types/CourtCase';
 
 // Tag color mapping
 const TAG_COLORS: { [key: string]: string } = {
@@ -34,11 +35,47 @@ const TAG_COLORS: { [key: string]: string } = {
   'default': 'blue'
 };
 
+// Pages linked per tag before the rest are summarized
+const MAX_PAGE_LINKS = 8;
+
+type Evidence = { [tag: string]: TagEvidence };
+
+// Snippets are split into files by the first two characters of the content hash,
+// so showing them for a case only fetches one small file
+const loadEvidence = async (contentHash: string): Promise<Evidence> => {
+  const bucket = await import(`@/data/court_cases.snippets/${contentHash.slice(0, 2)}.json`);
+  return bucket.default[contentHash] || {};
+};
+
 interface Props {
   courtCase: CourtCase;
 }
 
 export const CourtCaseCard: React.FC<Props> = ({ courtCase }) => {
+  const [evidence, setEvidence] = useState<Evidence | null>(null);
+  const [evidenceState, setEvidenceState] = useState<'hidden' | 'loading' | 'shown' | 'missing'>('hidden');
+
+  const toggleEvidence = async () => {
+    if (evidenceState === 'shown' || evidenceState === 'missing') {
+      setEvidenceState('hidden');
+      return;
+    }
+    if (!courtCase.content_hash || evidenceState === 'loading') return;
+    if (evidence) {
+      setEvidenceState('shown');
+      return;
+    }
+    setEvidenceState('loading');
+    try {
+      const loaded = await loadEvidence(courtCase.content_hash);
+      setEvidence(loaded);
+      setEvidenceState(Object.keys(loaded).length > 0 ? 'shown' : 'missing');
+    } catch {
+      // No snippets were generated for this data set
+      setEvidenceState('missing');
+    }
+  };
+
   const getTagColor = (tag: string) => {
     return TAG_COLORS[tag] || TAG_COLORS.default;
   };
@@ -136,6 +173,57 @@ export const CourtCaseCard: React.FC<Props> = ({ courtCase }) => {
           ) : (
             <p className="text-sm text-gray-500 italic">No significant tags found</p>
           )}
+
+          {courtCase.content_hash && visibleTags.length > 0 && (
+            <div className="space-y-2">
+              <button
+                onClick={toggleEvidence}
+                className="text-sm text-gray-500 hover:text-gray-300 transition-colors duration-200"
+              >
+                {evidenceState === 'loading' ? 'Loading evidence…' :
+                  evidenceState === 'shown' || evidenceState === 'missing' ? 'Hide evidence' : 'Show evidence'}
+              </button>
+
+              {evidenceState === 'missing' && (
+                <p className="text-sm text-gray-500 italic">No snippets available for this case</p>
+              )}
+
+              {evidenceState === 'shown' && evidence && visibleTags.filter(tag => evidence[tag]).map((tag) => {
+                const tagEvidence = evidence[tag];
+                return (
+                  <div key={tag} className="space-y-1">
+                    <div className="text-xs text-gray-400">
+                      <span className="font-medium text-gray-300">{tag}</span> on {tagEvidence.pages.length === 1 ? 'page' : 'pages'}{' '}
+                      {tagEvidence.pages.slice(0, MAX_PAGE_LINKS).map((page, i) => (
+                        <span key={page}>
+                          {i > 0 && ', '}
+                          <a
+                            href={`${courtCase.verdict_pdf}#page=${page}`}
+                            target="_blank"
+                            rel="noopener noreferrer"
+                            className="text-blue-400 hover:text-blue-300"
+                          >
+                            {page}
+                          </a>
+                        </span>
+                      ))}
+                      {tagEvidence.pages.length > MAX_PAGE_LINKS && ` and ${tagEvidence.pages.length - MAX_PAGE_LINKS} more`}
+                    </div>
+                    {tagEvidence.snippets.map((snippet, i) => (
+                      <p key={i} className="text-xs text-gray-500 bg-gray-800/50 rounded px-2 py-1">
+                        <span className="text-gray-600 mr-1">p. {snippet.page}</span>
+                        {snippet.text.slice(0, snippet.start)}
+                        <mark className="bg-yellow-500/20 text-yellow-300 rounded px-0.5">
+                          {snippet.text.slice(snippet.start, snippet.start + tag.length)}
+                        </mark>
+                        {snippet.text.slice(snippet.start + tag.length)}
+                      </p>
+                    ))}
+                  </div>
+                );
+              })}
+            </div>
+          )}
         </div>
         
         <div className="mt-4 pt-4 border-t border-gray-700/50">
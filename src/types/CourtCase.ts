@@ -8,4 +8,25 @@ export interface CourtCase {
   };
   date?: string;  // Optional since some older cases might not have dates
   num_pages: number;
-} 
\ No newline at end of file
+  related_cases?: RelatedCase[];  // Similar verdicts found with MinHash, most similar first
+  filename?: string;
+  content_hash?: string;  // SHA-256 of the PDF, also the key of its snippets
+}
+
+export interface RelatedCase {
+  filename: string;
+  court_ids: string[];
+  similarity: number;
+} 
+
+export interface Snippet {
+  page: number;
+  text: string;
+  start: number;  // The keyword is at text.slice(start, start + tag.length)
+}
+
+export interface TagEvidence {
+  pages: number[];   // Pages the tag is mentioned on
+  counts: number[];  // Mentions on each of those pages
+  snippets: Snippet[];
+}